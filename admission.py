@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Admission control for tool calls.
+
+Each limited tool gets a ToolLimiter: at most `concurrency` calls run at
+once, up to `max_queue` more wait in a priority queue (interactive before
+batch, FIFO within a priority), and anything beyond that is turned away
+immediately with a retryable Overloaded error instead of queueing without
+bound. Short queues keep tail latency flat under overload; clients back off
+and retry rather than time out.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+PRIORITIES: Dict[str, int] = {"interactive": 0, "batch": 10}
+
+
+class Overloaded(RuntimeError):
+    """The tool's queue is full; the call may be retried after retry_after seconds"""
+
+    def __init__(self, tool: str, retry_after: float):
+        super().__init__(f"Server busy: {tool} queue is full, retry in {retry_after:.2f}s")
+        self.tool = tool
+        self.retry_after = retry_after
+
+
+def priority_rank(priority: Union[str, int, None], default: str = "interactive") -> int:
+    """Map a priority name or number to a rank; lower ranks run first"""
+    if priority is None:
+        priority = default
+    if isinstance(priority, bool):
+        raise ValueError(f"Invalid priority: {priority!r}")
+    if isinstance(priority, int):
+        return priority
+    try:
+        return PRIORITIES[priority]
+    except KeyError:
+        raise ValueError(f"Unknown priority '{priority}', expected one of {sorted(PRIORITIES)}") from None
+
+
+class ToolLimiter:
+    """Concurrency limit plus bounded priority queue for one tool"""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int):
+        if concurrency <= 0:
+            raise ValueError("concurrency must be positive")
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._queued = 0
+        self._seq = itertools.count()
+        # Smoothed seconds per call, used to suggest when to retry
+        self._service_time = 0.0
+        self.admitted = 0
+        self.rejected = 0
+
+    async def acquire(self, rank: int) -> None:
+        if self.active < self.concurrency and not self._queued:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (rank, next(self._seq), future))
+        self._queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled: pass it on
+                self.release()
+            else:
+                future.cancel()
+                self._queued -= 1
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Hand the slot to the best waiter, or free it"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._queued -= 1
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def retry_after(self) -> float:
+        """Rough time for the current queue to drain by one slot"""
+        return max(0.05, self._service_time * (self._queued + 1) / self.concurrency)
+
+    def observe(self, seconds: float) -> None:
+        self._service_time = seconds if not self._service_time else 0.8 * self._service_time + 0.2 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self._queued,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class Admission:
+    """Async context manager holding one slot of a ToolLimiter"""
+
+    def __init__(self, limiter: Optional[ToolLimiter], rank: int):
+        self.limiter = limiter
+        self.rank = rank
+        self._started = 0.0
+
+    async def __aenter__(self):
+        if self.limiter is not None:
+            await self.limiter.acquire(self.rank)
+            self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.limiter is not None:
+            self.limiter.observe(time.monotonic() - self._started)
+            self.limiter.release()
+        return False
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[int, Optional[int]]]:
+    """Parse "tool=concurrency[:queue],..." into {tool: (concurrency, queue)}"""
+    limits: Dict[str, Tuple[int, Optional[int]]] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        concurrency, _, queue = value.partition(":")
+        try:
+            limits[name.strip()] = (int(concurrency), int(queue) if queue else None)
+        except ValueError:
+            raise ValueError(f"Invalid tool limit '{item}', expected tool=concurrency[:queue]") from None
+    return limits
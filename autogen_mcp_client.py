@@ -3,13 +3,15 @@ try:
     from autogen_core import AgentId, SingleThreadedAgentRuntime
     from autogen_core.model_context import BufferedChatCompletionContext
     from autogen_ext.models.openai import OpenAIChatCompletionClient
-    from autogen_ext.tools.mcp import McpWorkbench, StdioServerParams
+    from autogen_ext.tools.mcp import StdioServerParams
     print("AutoGen MCP extension loaded successfully")
 except ImportError as e:
     print(f"Missing AutoGen MCP: {e}")
     print("Install with: pip install autogen-agentchat autogen-ext[mcp]")
     exit(1)
 
+from autogen_workbench_pool import McpWorkbenchPool
+
 class AutoGenMCPClient:
     def __init__(self):
         self.runtime = None
@@ -23,8 +25,10 @@ class AutoGenMCPClient:
             args=["mcp_server.py"]
         )
         
-        # Initialize MCP workbench with single server params
-        self.workbench = McpWorkbench(mcp_server_params)
+        # Initialize a pool of MCP workbenches (one warm server each) so agents
+        # calling tools at the same time do not queue behind one session
+        self.workbench = McpWorkbenchPool(mcp_server_params, size=3)
+        await self.workbench.start()
         
         # Initialize runtime
         self.runtime = SingleThreadedAgentRuntime()
@@ -48,12 +52,27 @@ class AutoGenMCPClient:
         except Exception as e:
             print(f"Search test failed: {e}")
         
+        # Concurrent calls, as several agents would issue them, spread across the pool
+        cities = ["New York", "London", "Tokyo", "Paris", "Sydney", "Berlin"]
+        results = await asyncio.gather(*(
+            self.workbench.call_tool("get_weather", {"location": city}) for city in cities
+        ))
+        for result in results:
+            print(f"Concurrent weather result: {result.to_text()}")
+        
         print("✓ AutoGen MCP integration working!")
+    
+    async def close(self):
+        if self.workbench:
+            await self.workbench.stop()
 
 # Example usage
 async def main():
     client = AutoGenMCPClient()
-    await client.connect_and_test()
+    try:
+        await client.connect_and_test()
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
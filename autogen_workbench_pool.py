@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Pool of AutoGen MCP workbenches over warm server processes.
+
+One McpWorkbench owns one server session, and agents sharing it queue up
+behind each other's tool calls. McpWorkbenchPool is itself a Workbench, so
+it can be handed to agents in place of a single McpWorkbench. It starts N
+workbenches (N server processes) concurrently and sends each call to the
+workbench with the fewest calls in flight. Each workbench's list_tools()
+result is cached after the first fetch and cleared by reset().
+
+    async with McpWorkbenchPool(StdioServerParams(command="python", args=["mcp_server.py"]), size=4) as pool:
+        results = await asyncio.gather(*(pool.call_tool("get_weather", {"location": c}) for c in cities))
+"""
+import asyncio
+from typing import Any, List, Mapping, Optional
+
+try:
+    from autogen_core import CancellationToken
+    from autogen_core.tools import ToolResult, ToolSchema, Workbench
+    from autogen_ext.tools.mcp import McpServerParams, McpWorkbench
+except ImportError as e:
+    print(f"Missing AutoGen MCP: {e}")
+    print("Install with: pip install autogen-agentchat autogen-ext[mcp]")
+    exit(1)
+
+
+class McpWorkbenchPool(Workbench):
+    """Least-loaded dispatch over several McpWorkbench instances"""
+
+    def __init__(self, server_params: McpServerParams, size: int = 2, **workbench_kwargs: Any):
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self.workbenches = [McpWorkbench(server_params, **workbench_kwargs) for _ in range(size)]
+        self._tools: List[Optional[List[ToolSchema]]] = [None] * size
+        self._in_flight = [0] * size
+        self._started = False
+        # Calls arriving before the pool is up all wait for a single start
+        self._start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Start every workbench's server and fetch its tool list concurrently"""
+        async with self._start_lock:
+            if self._started:
+                return
+            await asyncio.gather(*(workbench.start() for workbench in self.workbenches))
+            self._started = True
+            await asyncio.gather(*(self._list_tools(i) for i in range(len(self.workbenches))))
+
+    async def stop(self) -> None:
+        async with self._start_lock:
+            if not self._started:
+                return
+            self._started = False
+            await asyncio.gather(*(workbench.stop() for workbench in self.workbenches), return_exceptions=True)
+            self._tools = [None] * len(self.workbenches)
+
+    async def reset(self) -> None:
+        await asyncio.gather(*(workbench.reset() for workbench in self.workbenches))
+        self._tools = [None] * len(self.workbenches)
+
+    async def _list_tools(self, index: int) -> List[ToolSchema]:
+        if self._tools[index] is None:
+            self._tools[index] = await self.workbenches[index].list_tools()
+        return self._tools[index]
+
+    async def list_tools(self) -> List[ToolSchema]:
+        if not self._started:
+            await self.start()
+        return await self._list_tools(self._least_loaded())
+
+    def _least_loaded(self) -> int:
+        return min(range(len(self.workbenches)), key=self._in_flight.__getitem__)
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Mapping[str, Any] | None = None,
+        cancellation_token: CancellationToken | None = None,
+        call_id: str | None = None,
+    ) -> ToolResult:
+        if not self._started:
+            await self.start()
+        index = self._least_loaded()
+        self._in_flight[index] += 1
+        try:
+            return await self.workbenches[index].call_tool(name, arguments, cancellation_token, call_id)
+        finally:
+            self._in_flight[index] -= 1
+
+    async def save_state(self) -> Mapping[str, Any]:
+        return {"workbenches": [await workbench.save_state() for workbench in self.workbenches]}
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        for workbench, workbench_state in zip(self.workbenches, state.get("workbenches", [])):
+            await workbench.load_state(workbench_state)
@@ -1,8 +1,8 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 try:
-    from mcp import ClientSession, StdioServerParameters
-    from mcp.client.stdio import stdio_client
+    from mcp import StdioServerParameters
     import boto3
     from langchain_aws import ChatBedrock
     from langchain.tools import BaseTool
@@ -11,22 +11,31 @@ except ImportError as e:
     print("Install with: pip install mcp langchain langchain-aws boto3")
     exit(1)
 
+from intent_router import ROUTER_HINTS, IntentRouter
+from loop_bridge import LoopThread
+from mcp_session_pool import ResilientSession, result_text
+
 class MCPBedrockTool(BaseTool):
     name: str
     description: str
     
-    def __init__(self, tool_name: str, description: str, session):
+    def __init__(self, tool_name: str, description: str, session, bridge: LoopThread):
         super().__init__(name=tool_name, description=description)
         self._tool_name = tool_name
         self._session = session
+        self._bridge = bridge
     
     def _run(self, **kwargs) -> str:
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self._async_run(**kwargs))
+        # The session lives on the bridge loop; this is safe from any thread,
+        # including threads already running their own event loop
+        return self._bridge.run(self._async_run(**kwargs))
+    
+    async def _arun(self, **kwargs) -> str:
+        return await self._bridge.run_async(self._async_run(**kwargs))
     
     async def _async_run(self, **kwargs) -> str:
         result = await self._session.call_tool(self._tool_name, kwargs)
-        return result.content[0].text if result.content else ""
+        return result_text(result)
 
 class BedrockMCPClient:
     def __init__(self, server_command: List[str], region: str = "us-east-1"):
@@ -35,6 +44,10 @@ class BedrockMCPClient:
         self.session = None
         self.tools = []
         self.llm = None
+        self.llm_with_tools = None
+        self.router = None
+        # Event loop thread that owns the MCP session, shared by sync and async callers
+        self.bridge = LoopThread()
     
     async def connect(self):
         server_params = StdioServerParameters(
@@ -42,71 +55,110 @@ class BedrockMCPClient:
             args=["mcp_server.py"]
         )
         
-        async with stdio_client(server_params) as (read_stream, write_stream):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                
-                # Get available tools
-                tools_response = await session.list_tools()
-                
-                # Create Bedrock tools from MCP tools
-                for tool in tools_response.tools:
-                    bedrock_tool = MCPBedrockTool(
-                        tool_name=tool.name,
-                        description=tool.description,
-                        session=session
-                    )
-                    self.tools.append(bedrock_tool)
-                
-                # Create Bedrock LLM
-                try:
-                    self.llm = ChatBedrock(
-                        model_id="anthropic.claude-3-sonnet-20240229-v1:0",
-                        region_name=self.region
-                    )
-                    print("Bedrock LLM initialized successfully")
-                except Exception as e:
-                    print(f"Bedrock setup failed: {e}")
-                    print("Ensure AWS credentials are configured and Bedrock access is enabled.")
-                
-                # Test direct tool usage
-                print("Testing Bedrock MCP integration...")
-                
-                # Test weather tool
-                weather_result = await session.call_tool("get_weather", {"location": "Seattle"})
-                print(f"Weather result: {weather_result.content[0].text}")
-                
-                # Test search tool
-                search_result = await session.call_tool("search_documents", {"query": "AWS", "limit": 5})
-                print(f"Search result: {search_result.content[0].text}")
-                
-                print("✓ Bedrock MCP integration working!")
+        # Open the session on the bridge loop and keep it for the client's lifetime;
+        # it pings the server and reconnects (retrying in-flight calls) if it dies
+        self.session = await self.bridge.run_async(ResilientSession(server_params).start())
+        
+        # Create Bedrock tools from MCP tools
+        for tool in self.session.tools:
+            bedrock_tool = MCPBedrockTool(
+                tool_name=tool.name,
+                description=tool.description,
+                session=self.session,
+                bridge=self.bridge
+            )
+            self.tools.append(bedrock_tool)
+        
+        # Simple requests are routed to a tool locally, skipping the LLM round trip
+        self.router = IntentRouter(self.session.tools, hints=ROUTER_HINTS)
+        
+        # Create Bedrock LLM
+        try:
+            self.llm = ChatBedrock(
+                model_id="anthropic.claude-3-sonnet-20240229-v1:0",
+                region_name=self.region
+            )
+            self.llm_with_tools = self.llm.bind_tools([
+                {"name": tool.name, "description": tool.description, "input_schema": tool.inputSchema}
+                for tool in self.session.tools
+            ])
+            print("Bedrock LLM initialized successfully")
+        except Exception as e:
+            print(f"Bedrock setup failed: {e}")
+            print("Ensure AWS credentials are configured and Bedrock access is enabled.")
+        
+        # Test direct tool usage
+        print("Testing Bedrock MCP integration...")
+        
+        # Test weather tool
+        weather_result = await self.call_tool("get_weather", {"location": "Seattle"})
+        print(f"Weather result: {weather_result}")
+        
+        # Test search tool
+        search_result = await self.call_tool("search_documents", {"query": "AWS", "limit": 5})
+        print(f"Search result: {search_result}")
+        
+        print("✓ Bedrock MCP integration working!")
+    
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        if not self.session:
+            raise RuntimeError("Client not connected. Call connect() first.")
+        result = await self.bridge.run_async(self.session.call_tool(tool_name, arguments))
+        return result_text(result)
     
     async def invoke(self, message: str) -> str:
         if not self.session:
             raise RuntimeError("Client not connected. Call connect() first.")
         
-        # Simple tool routing for demo
-        if "weather" in message.lower():
-            result = await self.session.call_tool("get_weather", {"location": "Seattle"})
-            return result.content[0].text if result.content else ""
-        elif "search" in message.lower() or "document" in message.lower():
-            result = await self.session.call_tool("search_documents", {"query": "AWS", "limit": 5})
-            return result.content[0].text if result.content else ""
+        # Confident local match: call the tool directly
+        route = self.router.route(message)
+        if route is not None:
+            return await self.call_tool(route.tool, route.arguments)
         
-        return f"Processed with Bedrock: {message}"
+        if self.llm_with_tools is None:
+            return f"Processed with Bedrock: {message}"
+        
+        # Ambiguous request: let the model choose tools and arguments
+        response = await self.llm_with_tools.ainvoke(message)
+        if not response.tool_calls:
+            return response.content if isinstance(response.content, str) else str(response.content)
+        results = await asyncio.gather(*(
+            self.call_tool(call["name"], call["args"]) for call in response.tool_calls
+        ))
+        return "\n".join(results)
     
     async def search_documents(self, query: str, limit: int = 10) -> str:
-        result = await self.session.call_tool("search_documents", {
+        return await self.call_tool("search_documents", {
             "query": query,
             "limit": limit
         })
-        return result.content[0].text if result.content else ""
+    
+    async def close(self):
+        if self.session is not None:
+            await self.bridge.run_async(self.session.close())
+            self.session = None
+        self.bridge.stop()
 
 # Example usage
 async def main():
     client = BedrockMCPClient(["python", "mcp_server.py"])
     await client.connect()
+    
+    try:
+        # Simple requests are answered without an LLM call
+        for message in ["What's the weather in Tokyo?", "Search documents about machine learning, top 3"]:
+            print(f"Routed locally: {client.router.route(message)}")
+            print(await client.invoke(message))
+        
+        # LangChain executors call tools synchronously from worker threads;
+        # the calls run concurrently over the one shared session
+        weather_tool = next(tool for tool in client.tools if tool.name == "get_weather")
+        cities = ["Seattle", "Tokyo", "London", "Paris"]
+        with ThreadPoolExecutor(max_workers=len(cities)) as executor:
+            for report in executor.map(lambda city: weather_tool._run(location=city), cities):
+                print(f"Threaded tool call: {report}")
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Bounded LRU cache with per-entry TTL and single-flight loading.
+
+Used by the MCP server to front slow upstream calls: concurrent lookups of the
+same missing key share one in-flight load instead of each calling upstream.
+ToolResultCache applies the same cache on the client side to whole tool
+calls, so repeated identical calls skip the round trip to the server.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+MISSING = object()
+
+
+class TTLCache:
+    """LRU cache whose entries expire ttl seconds after they are stored"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return a live entry and mark it recently used, counting hit or miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = (value, self._clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None) -> Any:
+        """Return the cached value or load it once for all concurrent callers.
+
+        Failed loads are not cached; every caller waiting on that load sees
+        the exception. A cancelled caller leaves the shared load running for
+        the others, but once every caller has gone the load is cancelled too.
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader, ttl))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            remaining = self._waiters.pop(task) - 1
+            if remaining:
+                self._waiters[task] = remaining
+            elif not task.done():
+                # New callers must start a fresh load, not join this dying one
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                task.cancel()
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring cache effectiveness"""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
+
+
+class ToolResultCache:
+    """Cache of tool call results keyed by tool name and canonical JSON arguments.
+
+    ttls overrides default_ttl per tool; a TTL of 0 or a tool listed in
+    exclude (e.g. non-idempotent tools) is never cached.
+    """
+
+    def __init__(self, maxsize: int = 1024, default_ttl: float = 60.0,
+                 ttls: Optional[Dict[str, float]] = None, exclude: Iterable[str] = ()):
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.exclude = frozenset(exclude)
+        self._cache = TTLCache(maxsize=maxsize, ttl=default_ttl)
+
+    @staticmethod
+    def key(tool: str, arguments: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+        """Equal arguments give equal keys regardless of dict order"""
+        return tool, json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+    def ttl(self, tool: str) -> float:
+        return 0.0 if tool in self.exclude else self.ttls.get(tool, self.default_ttl)
+
+    async def get_or_call(self, tool: str, arguments: Optional[Dict[str, Any]],
+                          call: Callable[[], Awaitable[Any]],
+                          is_error: Callable[[Any], bool] = lambda result: False) -> Any:
+        """Return a cached result for this call or make it; error results are not kept"""
+        ttl = self.ttl(tool)
+        if ttl <= 0:
+            return await call()
+        try:
+            key = self.key(tool, arguments)
+        except (TypeError, ValueError):  # arguments that are not JSON data
+            return await call()
+        result = await self._cache.get_or_load(key, call, ttl)
+        if is_error(result):
+            self._cache.invalidate(key)
+        return result
+
+    def invalidate(self, tool: Optional[str] = None) -> None:
+        """Drop cached results for one tool, or everything"""
+        if tool is None:
+            self._cache.clear()
+            return
+        for key in [key for key in self._cache._entries if key[0] == tool]:
+            self._cache.invalidate(key)
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
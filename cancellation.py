@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Cooperative cancellation and deadlines for tool handlers.
+
+Async handlers are cancelled by asyncio itself. Handlers running in a thread
+or process pool cannot be interrupted from outside, so the executor hands
+each call a CancelToken and long-running code polls it with check_cancelled()
+at convenient points (per segment, per posting block, ...). A token trips
+when the caller cancels the MCP request or when the client's deadline passes.
+
+Process pool workers share one byte per concurrent call with the server
+process (a RawArray passed to the pool initializer), so checking a token is
+a memory read rather than an IPC round trip.
+"""
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+
+class CallCancelled(Exception):
+    """The caller cancelled the request or its deadline passed"""
+
+
+class DeadlineExceeded(CallCancelled, TimeoutError):
+    """The client-supplied deadline passed before the call finished"""
+
+
+class CancelToken:
+    """Cancellation flag plus optional absolute deadline (time.time() seconds)"""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled():
+            raise CallCancelled("Request was cancelled")
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+
+# Per-call flags shared with the current process pool; set in each worker by init_worker
+_worker_flags = None
+
+
+class SlotToken(CancelToken):
+    """Token for process pool calls, backed by one slot of a shared flag array"""
+
+    def __init__(self, flags, slot: int, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self.slot = slot
+        self._flags = flags
+        flags[slot] = 0
+
+    def __getstate__(self):
+        # Shared arrays can only reach workers through the pool initializer
+        return {"deadline": self.deadline, "slot": self.slot}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _flags=None)
+
+    def cancel(self) -> None:
+        self._flags[self.slot] = 1
+
+    def cancelled(self) -> bool:
+        flags = self._flags if self._flags is not None else _worker_flags
+        return bool(flags is not None and flags[self.slot])
+
+
+_current: ContextVar[Optional[CancelToken]] = ContextVar("cancel_token", default=None)
+
+
+def check_cancelled() -> None:
+    """Raise CallCancelled if the tool call running in this context should stop"""
+    token = _current.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def run_with_token(handler: Callable[[Any], Any], token: CancelToken, arguments: Any) -> Any:
+    """Run a pool handler with token as the current call's cancellation token"""
+    reset = _current.set(token)
+    try:
+        token.raise_if_cancelled()
+        return handler(arguments)
+    finally:
+        _current.reset(reset)
+
+
+def _exit_with_parent() -> None:
+    # A server killed with SIGKILL never shuts its pool down; without this the
+    # workers would outlive it as orphans
+    parent = multiprocessing.parent_process()
+    if parent is not None:
+        multiprocessing.connection.wait([parent.sentinel])
+        os._exit(1)
+
+
+def init_worker(flags, initializer: Optional[Callable[[], Any]] = None) -> None:
+    """Process pool initializer: attach the shared flags, then run initializer"""
+    global _worker_flags
+    _worker_flags = flags
+    threading.Thread(target=_exit_with_parent, name="parent-watch", daemon=True).start()
+    if initializer is not None:
+        initializer()
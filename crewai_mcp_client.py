@@ -1,8 +1,5 @@
 import asyncio
 try:
-    from crewai import Agent, Task, Crew
-    from crewai.mcp import MCPServerStdio
-    from crewai.mcp.filters import create_static_tool_filter
     from langchain_aws import ChatBedrock
     print("CrewAI MCP adapter loaded successfully")
 except ImportError as e:
@@ -10,22 +7,11 @@ except ImportError as e:
     print("Install with: pip install crewai langchain-aws boto3")
     exit(1)
 
+from crewai_mcp_runner import run_research_crews
+
 class CrewAIMCPClient:
-    def __init__(self):
-        self.mcp_server = None
-        self.crew = None
-    
     async def connect_and_test(self):
         """Connect to MCP server using official CrewAI adapter with Bedrock LLM"""
-        # Initialize MCP server with stdio transport
-        self.mcp_server = MCPServerStdio(
-            command="python",
-            args=["mcp_server.py"]
-        )
-        
-        # Create tool filter for specific tools
-        tool_filter = create_static_tool_filter(["search_documents", "get_weather"])
-        
         # Create Bedrock LLM
         try:
             bedrock_llm = ChatBedrock(
@@ -36,34 +22,9 @@ class CrewAIMCPClient:
             print(f"Bedrock LLM setup failed: {e}. Configure AWS credentials.")
             return
         
-        # Create agent with MCP tools and Bedrock LLM
-        researcher = Agent(
-            role="Research Assistant",
-            goal="Help with document search and weather information",
-            backstory="Expert at finding information using available tools",
-            llm=bedrock_llm,
-            mcp_servers=[self.mcp_server],
-            mcp_tool_filter=tool_filter,
-            verbose=True
-        )
-        
-        # Create tasks
-        search_task = Task(
-            description="Search for documents about 'machine learning' and get weather for San Francisco",
-            expected_output="Document search results and weather information",
-            agent=researcher
-        )
-        
-        # Create and run crew
-        self.crew = Crew(
-            agents=[researcher],
-            tasks=[search_task],
-            verbose=True
-        )
-        
         print("Testing CrewAI MCP integration with Bedrock...")
-        result = await self.crew.kickoff_async()
-        print(f"Crew result: {result}")
+        # The demo crews share one MCP server pool (see crewai_mcp_runner.py)
+        await run_research_crews(bedrock_llm)
         print("✓ CrewAI MCP integration with Bedrock working!")
 
 # Example usage
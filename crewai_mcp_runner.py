@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Shared MCP server and concurrent crew execution for CrewAI.
+
+An Agent built with mcp_servers=[MCPServerStdio(...)] gets its own server
+connection, so running hundreds of crews starts hundreds of servers.
+CrewRunner starts one SessionPool of warm servers, turns the MCP tools into
+CrewAI tools once (applying the tool name filter once as well), and gives
+those tools to every agent. kickoff_async runs crews in worker threads, so
+tool calls go to the pool's event loop through a LoopThread.
+run_research_crews is the demo both CrewAI client scripts run; they differ
+only in the LLM they pass in.
+
+    async with CrewRunner(["python", "mcp_server.py"], ["get_weather"]) as runner:
+        results = await runner.run_many(build_crew, [{"city": "Tokyo"}, {"city": "Paris"}])
+"""
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Type
+
+try:
+    from crewai import Agent, Crew, Task
+    from crewai.tools import BaseTool
+    from mcp import StdioServerParameters
+    from mcp.types import Tool
+    from pydantic import BaseModel, Field, create_model
+except ImportError as e:
+    print(f"Missing CrewAI MCP: {e}")
+    print("Install with: pip install crewai")
+    exit(1)
+
+from loop_bridge import LoopThread
+from mcp_session_pool import SessionPool, result_text
+from tool_catalog import ToolCatalog
+
+# Crews running at once in run_many
+MAX_PARALLEL_CREWS = 8
+
+# Demo crews: one per input; {topic} and {city} are filled in from the input
+CREW_INPUTS = [
+    {"topic": "machine learning", "city": "San Francisco"},
+    {"topic": "AI agents", "city": "Tokyo"},
+    {"topic": "vector search", "city": "London"},
+]
+CREW_SERVER = ["python", "mcp_server.py"]
+CREW_TOOLS = ["search_documents", "get_weather"]
+
+JSON_TYPES = {"string": str, "integer": int, "number": float, "boolean": bool, "array": list, "object": dict}
+
+
+def args_model(tool: Tool) -> Type[BaseModel]:
+    """Pydantic argument model for CrewAI built from an MCP tool's input schema"""
+    schema = tool.inputSchema or {}
+    required = set(schema.get("required", []))
+    fields = {}
+    for name, prop in schema.get("properties", {}).items():
+        python_type = JSON_TYPES.get(prop.get("type"), Any)
+        description = prop.get("description", "")
+        if name in required:
+            fields[name] = (python_type, Field(..., description=description))
+        else:
+            fields[name] = (Optional[python_type], Field(prop.get("default"), description=description))
+    return create_model(f"{tool.name}_args", **fields)
+
+
+class MCPCrewTool(BaseTool):
+    """CrewAI tool that calls an MCP tool on a shared SessionPool"""
+    name: str
+    description: str
+    args_schema: Type[BaseModel]
+
+    def __init__(self, tool: Tool, pool: SessionPool, bridge: LoopThread):
+        super().__init__(name=tool.name, description=tool.description or tool.name, args_schema=args_model(tool))
+        self._pool = pool
+        self._bridge = bridge
+
+    def _run(self, **kwargs) -> str:
+        return self._bridge.run(self._call(kwargs))
+
+    async def _call(self, arguments: Dict[str, Any]) -> str:
+        arguments = {key: value for key, value in arguments.items() if value is not None}
+        result = await self._pool.call_tool(self.name, arguments)
+        return result_text(result)
+
+
+class CrewRunner:
+    """Runs many crews concurrently over one pool of MCP servers"""
+
+    def __init__(self, server_command: List[str], tool_names: Optional[List[str]] = None,
+                 pool_size: int = 2, max_parallel: int = MAX_PARALLEL_CREWS):
+        self.params = StdioServerParameters(command=server_command[0], args=server_command[1:])
+        self.tool_names = tool_names
+        self.pool_size = pool_size
+        self.max_parallel = max_parallel
+        self.bridge: Optional[LoopThread] = None
+        self.pool: Optional[SessionPool] = None
+        self.tools: List[MCPCrewTool] = []
+
+    async def __aenter__(self) -> "CrewRunner":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Start the server pool and build the filtered tool list once"""
+        self.bridge = LoopThread("crew-mcp-loop")
+        self.pool = SessionPool(self.params, self.pool_size, catalog=ToolCatalog())
+        await self.bridge.run_async(self.pool.start())
+        allowed = set(self.tool_names) if self.tool_names is not None else None
+        self.tools = [
+            MCPCrewTool(tool, self.pool, self.bridge)
+            for tool in self.pool.tools
+            if allowed is None or tool.name in allowed
+        ]
+
+    async def run_many(self, build_crew: Callable[[List[BaseTool]], Crew],
+                       inputs: List[Dict[str, Any]]) -> List[Any]:
+        """kickoff_async one crew per input, at most max_parallel at a time.
+
+        Results are in input order; a crew that fails yields its exception.
+        """
+        if self.pool is None:
+            raise RuntimeError("Runner not started. Call start() first.")
+        semaphore = asyncio.Semaphore(self.max_parallel)
+
+        async def run_one(crew_inputs: Dict[str, Any]) -> Any:
+            async with semaphore:
+                return await build_crew(self.tools).kickoff_async(inputs=crew_inputs)
+
+        return await asyncio.gather(*(run_one(i) for i in inputs), return_exceptions=True)
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.bridge.run_async(self.pool.close())
+            self.pool = None
+        if self.bridge is not None:
+            self.bridge.stop()
+            self.bridge = None
+        self.tools = []
+
+
+def research_crew(llm: Any, tools: List[BaseTool]) -> Crew:
+    """The demo crew: one research agent with the shared MCP tools"""
+    researcher = Agent(
+        role="Research Assistant",
+        goal="Help with document search and weather information",
+        backstory="Expert at finding information using available tools",
+        llm=llm,
+        tools=tools,
+        verbose=True
+    )
+    search_task = Task(
+        description="Search for documents about '{topic}' and get weather for {city}",
+        expected_output="Document search results and weather information",
+        agent=researcher
+    )
+    return Crew(agents=[researcher], tasks=[search_task], verbose=True)
+
+
+async def run_research_crews(llm: Any, inputs: List[Dict[str, Any]] = CREW_INPUTS) -> List[Any]:
+    """Run one demo crew per input with llm, all sharing one server pool"""
+    # One shared MCP server pool for every crew; the tool filter is applied once here
+    async with CrewRunner(CREW_SERVER, CREW_TOOLS) as runner:
+        # Crews run concurrently (bounded by the runner) over the shared servers
+        results = await runner.run_many(lambda tools: research_crew(llm, tools), inputs)
+    for crew_inputs, result in zip(inputs, results):
+        print(f"Crew result for {crew_inputs}: {result}")
+    return results
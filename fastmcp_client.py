@@ -12,6 +12,9 @@ except ImportError:
     print("MCP not installed. Install with: pip install mcp")
     exit(1)
 
+from mcp_session_pool import result_text
+from tool_catalog import CatalogTracker, ToolCatalog, server_identity
+
 class FastMCPClient:
     def __init__(self):
         self.session = None
@@ -24,13 +27,17 @@ class FastMCPClient:
             args=["fastmcp_server.py"]
         )
         
+        # Tool schemas come from the on-disk catalog when the server version
+        # matches, and are refreshed in the background or on tools/list_changed
+        tracker = CatalogTracker(server_identity(server_params), ToolCatalog())
+        
         async with stdio_client(server_params) as (read_stream, write_stream):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
+            async with ClientSession(read_stream, write_stream, message_handler=tracker.message_handler) as session, tracker:
+                init = await session.initialize()
                 
                 # Get available tools
-                tools_response = await session.list_tools()
-                self.available_tools = [tool.name for tool in tools_response.tools]
+                await tracker.attach(session, init)
+                self.available_tools = tracker.tool_names
                 print(f"Connected to FastMCP server! Available tools: {self.available_tools}")
                 
                 # Test search_documents
@@ -39,14 +46,14 @@ class FastMCPClient:
                     "query": "machine learning",
                     "limit": 5
                 })
-                print(f"Search result: {search_result.content[0].text}")
+                print(f"Search result: {result_text(search_result)}")
                 
                 # Test get_weather
                 print("\n2. Testing weather lookup...")
                 weather_result = await session.call_tool("get_weather", {
                     "location": "New York"
                 })
-                print(f"Weather result: {weather_result.content[0].text}")
+                print(f"Weather result: {result_text(weather_result)}")
                 
                 print("\n✓ FastMCP server integration working!")
 
@@ -2,24 +2,53 @@
 """
 FastMCP server implementation with the same tools as the standard MCP server.
 """
+from typing import Annotated, List, Literal, Optional
+
 try:
     from fastmcp import FastMCP
+    from fastmcp.tools import Tool
+    from mcp.types import TextContent
+    from pydantic import Field
 except ImportError:
     print("FastMCP not installed. Install with: pip install fastmcp")
     exit(1)
 
-# Create FastMCP server
-mcp = FastMCP("framework-fastmcp-server")
+import search_index
+import weather
+from tool_catalog import schema_version
+
+def search_documents(
+    query: str,
+    limit: Annotated[int, Field(ge=1)] = 10,
+    mode: Literal["keyword", "semantic"] = "keyword",
+    cursor: Optional[str] = None,
+) -> List[TextContent]:
+    """Search through documents using keyword (BM25) or semantic (embedding similarity) ranking.
 
-@mcp.tool()
-def search_documents(query: str, limit: int = 10) -> str:
-    """Search through documents"""
-    return f"Found {limit} documents matching '{query}'"
+    Results are paged; pass the returned cursor to get more.
+    """
+    chunks = search_index.search_page(query, limit, mode, cursor).chunks()
+    return [TextContent(type="text", text=chunk) for chunk in chunks]
 
-@mcp.tool()
-def get_weather(location: str) -> str:
+async def get_weather(location: str) -> str:
     """Get weather information"""
-    return f"Weather in {location}: 72°F, sunny"
+    return await weather.get_weather(location)
+
+async def get_weather_batch(locations: List[str]) -> str:
+    """Get weather information for many locations in one call"""
+    return "\n".join(await weather.get_weather_batch(locations))
+
+TOOLS = [Tool.from_function(fn) for fn in (search_documents, get_weather, get_weather_batch)]
+
+# Create FastMCP server; the version is a hash of the tool schemas, so client
+# tool catalogs notice changes
+mcp = FastMCP(
+    "framework-fastmcp-server",
+    version=schema_version([tool.to_mcp_tool() for tool in TOOLS]),
+    tools=TOOLS,
+)
 
 if __name__ == "__main__":
+    # Fold segments written by ingest.py together while serving queries
+    search_index.start_background_merger()
     mcp.run()
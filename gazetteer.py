@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Local gazetteer that maps free-text locations to canonical place IDs.
+
+"NYC", "New York", "new york, ny" and "New York City" all resolve to the same
+place, so get_weather caches and queries upstream once per place rather than
+once per spelling. Names are looked up in a prefix trie: first exactly, then
+after dropping state/country qualifiers ("seattle wa" -> "seattle", while
+"paris tx" is not Paris, France), then by a
+bounded edit-distance walk of the trie for typos ("Tokio", "San Fransisco"),
+and finally by unique prefix completion ("san fran").
+
+Extra places can be loaded from a JSON file named by GAZETTEER_PATH:
+  {"fr-lyon": {"name": "Lyon, France", "aliases": ["lyon"]}}
+"""
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+PLACES: Dict[str, Tuple[str, List[str]]] = {
+    "us-ca-san-francisco": ("San Francisco, CA", ["san francisco", "sf", "san fran", "frisco", "san francisco ca"]),
+    "us-wa-seattle": ("Seattle, WA", ["seattle", "seattle wa", "sea"]),
+    "us-ny-new-york": ("New York, NY", ["new york", "new york city", "nyc", "new york ny", "ny ny", "manhattan"]),
+    "us-ca-los-angeles": ("Los Angeles, CA", ["los angeles", "la", "l a", "los angeles ca"]),
+    "us-il-chicago": ("Chicago, IL", ["chicago", "chicago il", "chi town"]),
+    "us-ma-boston": ("Boston, MA", ["boston", "boston ma"]),
+    "us-tx-austin": ("Austin, TX", ["austin", "austin tx"]),
+    "us-dc-washington": ("Washington, DC", ["washington dc", "washington d c", "dc", "d c"]),
+    "jp-tokyo": ("Tokyo, Japan", ["tokyo", "tokyo japan", "tokio"]),
+    "gb-london": ("London, UK", ["london", "london uk", "london england"]),
+    "fr-paris": ("Paris, France", ["paris", "paris france"]),
+    "de-berlin": ("Berlin, Germany", ["berlin", "berlin germany"]),
+    "au-sydney": ("Sydney, Australia", ["sydney", "sydney australia"]),
+    "in-mumbai": ("Mumbai, India", ["mumbai", "bombay"]),
+    "in-bengaluru": ("Bengaluru, India", ["bengaluru", "bangalore"]),
+    "sg-singapore": ("Singapore", ["singapore"]),
+    "ca-toronto": ("Toronto, Canada", ["toronto", "toronto canada"]),
+    "mx-mexico-city": ("Mexico City, Mexico", ["mexico city", "cdmx", "ciudad de mexico"]),
+    "br-sao-paulo": ("Sao Paulo, Brazil", ["sao paulo", "sao paulo brazil"]),
+    "cn-beijing": ("Beijing, China", ["beijing", "peking"]),
+    "hk-hong-kong": ("Hong Kong", ["hong kong", "hk"]),
+    "ae-dubai": ("Dubai, UAE", ["dubai"]),
+}
+
+# Words naming each country code used in place IDs ("us-wa-seattle", "jp-tokyo").
+# A place accepts these, its US state code and the words after the comma in
+# its name as trailing qualifiers ("seattle wa usa"); any other qualifier
+# means a different place ("paris tx", "boston uk")
+COUNTRY_QUALIFIERS: Dict[str, str] = {
+    "us": "us usa united states america",
+    "gb": "uk gb united kingdom england great britain",
+    "jp": "japan", "fr": "france", "de": "germany", "au": "australia", "in": "india",
+    "sg": "singapore", "ca": "ca canada", "mx": "mexico", "br": "brazil", "cn": "china",
+    "hk": "china", "ae": "uae united arab emirates",
+}
+US_STATES = frozenset("al ak az ar ca co ct de dc fl ga hi id il in ia ks ky la me md ma mi mn ms mo mt ne nv "
+                      "nh nj nm ny nc nd oh ok or pa ri sc sd tn tx ut vt va wa wv wi wy".split())
+QUALIFIERS = frozenset(" ".join(COUNTRY_QUALIFIERS.values()).split()) | US_STATES
+
+_PUNCT_RE = re.compile(r"[^a-z0-9]+")
+
+
+class Place(NamedTuple):
+    id: str
+    name: str
+
+
+def qualifiers(place_id: str, name: str) -> frozenset:
+    """Trailing words consistent with a place: its country, US state and name suffix"""
+    codes = place_id.split("-")
+    words = set(COUNTRY_QUALIFIERS.get(codes[0], "").split())
+    if codes[0] == "us" and len(codes) > 2:
+        words.add(codes[1])
+    if "," in name:
+        words.update(normalize(name.split(",", 1)[1]).split())
+    return frozenset(words)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_PUNCT_RE.sub(" ", text.lower()).split())
+
+
+class _Node:
+    __slots__ = ("children", "place_id")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.place_id: Optional[str] = None
+
+
+class Trie:
+    """Character trie from normalized alias to place ID"""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, key: str, place_id: str) -> None:
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+        node.place_id = place_id
+
+    def _find(self, key: str) -> Optional[_Node]:
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def get(self, key: str) -> Optional[str]:
+        node = self._find(key)
+        return node.place_id if node else None
+
+    def completions(self, prefix: str) -> List[str]:
+        """Place IDs of every alias starting with prefix"""
+        node = self._find(prefix)
+        found = []
+        stack = [node] if node else []
+        while stack:
+            node = stack.pop()
+            if node.place_id is not None:
+                found.append(node.place_id)
+            stack.extend(node.children.values())
+        return found
+
+    def fuzzy(self, key: str, max_distance: int) -> List[Tuple[int, str]]:
+        """(edit distance, place ID) for aliases within max_distance of key.
+
+        Walks the trie computing one Levenshtein row per node and prunes
+        branches whose best possible distance already exceeds the bound.
+        """
+        results = []
+        first_row = list(range(len(key) + 1))
+        stack = [(child, ch, first_row) for ch, child in self.root.children.items()]
+        while stack:
+            node, ch, prev_row = stack.pop()
+            row = [prev_row[0] + 1]
+            for i in range(1, len(key) + 1):
+                cost = 0 if key[i - 1] == ch else 1
+                row.append(min(row[i - 1] + 1, prev_row[i] + 1, prev_row[i - 1] + cost))
+            if node.place_id is not None and row[-1] <= max_distance:
+                results.append((row[-1], node.place_id))
+            if min(row) <= max_distance:
+                stack.extend((child, next_ch, row) for next_ch, child in node.children.items())
+        return results
+
+
+class Gazetteer:
+    """Resolves free-text location names to canonical places"""
+
+    def __init__(self, places: Dict[str, Tuple[str, Iterable[str]]]):
+        self.names: Dict[str, str] = {}
+        self.qualifiers: Dict[str, frozenset] = {}
+        self.trie = Trie()
+        for place_id, (name, aliases) in places.items():
+            self.names[place_id] = name
+            self.qualifiers[place_id] = qualifiers(place_id, name)
+            for alias in [name, *aliases]:
+                self.trie.insert(normalize(alias), place_id)
+
+    def _place(self, place_id: str, dropped: Iterable[str] = ()) -> Optional[Place]:
+        """The place, or None when a dropped qualifier belongs somewhere else"""
+        if not self.qualifiers[place_id].issuperset(dropped):
+            return None
+        return Place(place_id, self.names[place_id])
+
+    def resolve(self, text: str) -> Optional[Place]:
+        """Return the canonical place for text, or None if it is unknown or ambiguous"""
+        key = normalize(text)
+        if not key:
+            return None
+
+        place_id = self.trie.get(key)
+        if place_id:
+            return self._place(place_id)
+
+        # Drop trailing state/country qualifiers: "seattle wa usa" -> "seattle"
+        words = key.split()
+        dropped: List[str] = []
+        while len(words) > 1 and words[-1] in QUALIFIERS:
+            dropped.append(words.pop())
+            place_id = self.trie.get(" ".join(words))
+            if place_id:
+                return self._place(place_id, dropped)
+        key = " ".join(words)
+
+        # Typos: names up to five characters tolerate one edit, longer names two
+        max_distance = 1 if len(key) <= 5 else 2
+        matches = self.trie.fuzzy(key, max_distance) if len(key) >= 4 else []
+        if matches:
+            best = min(distance for distance, _ in matches)
+            ids = {pid for distance, pid in matches if distance == best}
+            if len(ids) == 1:
+                return self._place(ids.pop(), dropped)
+            return None
+
+        # Unambiguous prefix: "san fran" -> San Francisco
+        if len(key) >= 3:
+            ids = set(self.trie.completions(key))
+            if len(ids) == 1:
+                return self._place(ids.pop(), dropped)
+        return None
+
+
+def _load_places() -> Dict[str, Tuple[str, Iterable[str]]]:
+    places: Dict[str, Tuple[str, Iterable[str]]] = dict(PLACES)
+    path = os.environ.get("GAZETTEER_PATH")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for place_id, entry in json.load(f).items():
+                places[place_id] = (entry["name"], entry.get("aliases", []))
+    return places
+
+
+gazetteer = Gazetteer(_load_places())
+
+
+@lru_cache(maxsize=4096)
+def resolve(text: str) -> Optional[Place]:
+    """Resolve a location with the default gazetteer (memoized)"""
+    return gazetteer.resolve(text)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Bulk document ingestion for the search_documents index.
+
+Streams documents from a directory of text files or a JSONL feed, tokenizes
+and embeds them in a process pool, and publishes each batch as a new
+immutable index segment. Running MCP servers pick up new segments on their
+next query, so no rebuild or restart is needed.
+
+Usage:
+  python ingest.py --dir ./docs
+  python ingest.py --jsonl feed.jsonl
+  cat feed.jsonl | python ingest.py --jsonl -
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import search_index
+
+DEFAULT_EXTENSIONS = (".txt", ".md", ".rst")
+SEGMENT_SIZE = 5000
+ANALYZE_CHUNK = 256
+
+
+def iter_directory(root: str, extensions: Sequence[str] = DEFAULT_EXTENSIONS) -> Iterator[Dict[str, Any]]:
+    """Yield one document per text file below root"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(tuple(extensions)):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            first_line = next((line for line in text.splitlines() if line.strip()), filename)
+            yield {
+                "id": os.path.relpath(path, root),
+                "title": first_line.strip().lstrip("#").strip(),
+                "text": text,
+            }
+
+
+def iter_jsonl_feed(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield documents from a JSONL file, or from stdin when path is '-'"""
+    if path != "-":
+        yield from search_index.read_jsonl(path)
+        return
+    for line in sys.stdin:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _analyze_batch(docs: List[Dict[str, Any]]) -> List[search_index.AnalyzedDoc]:
+    return [search_index.analyze_document(doc) for doc in docs]
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest(documents: Iterable[Dict[str, Any]], index_dir: Optional[str] = None,
+           workers: Optional[int] = None, segment_size: int = SEGMENT_SIZE) -> int:
+    """Index documents as new segments and return how many were added.
+
+    While one batch is being written as a segment, the next batch is already
+    being analyzed by the worker processes.
+    """
+    index_dir = index_dir or os.environ.get("MCP_INDEX_DIR", search_index.DEFAULT_INDEX_DIR)
+    total = 0
+
+    def publish(futures: List[Future]) -> int:
+        analyzed = [doc for future in futures for doc in future.result()]
+        name = search_index.add_segment(index_dir, analyzed)
+        print(f"Published {name} with {len(analyzed)} documents", file=sys.stderr)
+        return len(analyzed)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Optional[List[Future]] = None
+        for batch in _batched(documents, segment_size):
+            futures = [
+                pool.submit(_analyze_batch, batch[i:i + ANALYZE_CHUNK])
+                for i in range(0, len(batch), ANALYZE_CHUNK)
+            ]
+            if pending:
+                total += publish(pending)
+            pending = futures
+        if pending:
+            total += publish(pending)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add documents to the search_documents index")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="Directory of text files to index")
+    source.add_argument("--jsonl", help="JSONL feed with id/title/text fields ('-' for stdin)")
+    parser.add_argument("--index-dir", help="Index directory (default: $MCP_INDEX_DIR or .mcp_index)")
+    parser.add_argument("--workers", type=int, help="Tokenizer processes (default: CPU count)")
+    parser.add_argument("--segment-size", type=int, default=SEGMENT_SIZE, help="Documents per segment")
+    parser.add_argument("--ext", nargs="+", default=list(DEFAULT_EXTENSIONS),
+                        help="File extensions to index with --dir")
+    args = parser.parse_args()
+
+    if args.dir:
+        documents = iter_directory(args.dir, args.ext)
+    else:
+        documents = iter_jsonl_feed(args.jsonl)
+    count = ingest(documents, args.index_dir, args.workers, args.segment_size)
+    print(f"Ingested {count} documents")
+
+
+if __name__ == "__main__":
+    main()
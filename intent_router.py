@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Local intent router for MCP tools.
+
+Routes plain-language requests such as "weather in Tokyo" or "search
+documents about vector databases, top 5" straight to a tool call without an
+LLM round trip. The router is built once from the server's tool list:
+
+- keywords come from tool names (weight 3), argument names and enum values
+  (1.5), descriptions (1) and optional caller hints (2). A keyword shared by
+  several tools is worth proportionally less to each of them
+- every keyword is compiled into one regular expression, so a request is
+  scanned in a single pass, with inflections ("documents", "searching")
+  matched by prefix
+- arguments are extracted from the schema: counts such as "top 5", enum
+  values that appear before the query slot or next to a mode cue
+  ("semantic search", "keyword mode"), and the request text left after
+  removing the tool's keywords and filler words for the first required
+  string argument (split on commas and "and" for arrays, which need two or
+  more items). "documents about semantic web" keeps "semantic" in the query
+- an extracted string needs evidence: it follows a preposition ("in Tokyo",
+  "about vector databases") or is at least MIN_REMAINDER characters long,
+  and place arguments ("location") must resolve in the gazetteer, so "how is
+  the weather?" does not become get_weather(location="how")
+
+A tool only qualifies when the request names it: one of its name keywords
+or hints (an action such as "search" or "find", or its subject such as
+"weather") must appear, and every other word before the query slot (or
+before that cue, when there is no slot) must be one of its keywords or
+filler. "delete documents about cats" and "search the
+web for python tutorials" therefore fall through, as does "semantic web".
+All of its required arguments must also be extracted.
+route() returns the best one if its score reaches min_score and beats the
+runner-up by margin, and the request neither names another tool's subject
+("weather ... and documents ...") nor adds a second clause ("... because",
+"... and should I ..."); otherwise it returns None and the caller should ask
+the LLM.
+"""
+import re
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from mcp.types import Tool
+
+from gazetteer import resolve as resolve_place
+
+MIN_SCORE = 1.0
+MARGIN = 1.0
+# Extra score for a tool whose array argument received several items
+MULTI_ITEM_BONUS = 1.5
+# Shortest string argument taken from the leftover text without a preposition
+MIN_REMAINDER = 4
+# Arguments whose values must be places known to the gazetteer
+PLACE_ARGUMENTS = frozenset({"location", "locations", "city", "cities", "place", "places"})
+
+NAME_WEIGHT = 3.0
+HINT_WEIGHT = 2.0
+ARGUMENT_WEIGHT = 1.5
+DESCRIPTION_WEIGHT = 1.0
+
+# Extra phrases for this repo's server tools (mcp_server.py), beyond what their schemas say
+ROUTER_HINTS = {
+    "search_documents": ["find", "look up", "papers", "articles", "docs"],
+    "get_weather": ["forecast", "temperature"],
+    "get_weather_batch": ["forecast", "temperature"],
+}
+
+STOPWORDS = frozenset("""
+a about all also an and any are as at be by can could do does find for from get give how i in into is it
+its like me more my of on one or please show some tell that the their them there these this to today
+up us using what whats what's when where which who with would you your now current currently
+""".split())
+
+WORD = re.compile(r"[a-z][a-z0-9']*")
+COUNT = re.compile(
+    r"\b(?:top|first|limit|max(?:imum)?)\s+(\d+)\b|\b(\d+)\s+(?:results?|documents?|docs?|hits?|items?|matches)\b",
+    re.IGNORECASE,
+)
+# "in Tokyo", "about vector databases": the argument follows a preposition
+SLOT = re.compile(r"\b(?:in|for|about|on|at|regarding)\s+(\S.*)", re.IGNORECASE)
+# A second clause asks for more than one tool call can answer
+CLAUSE = re.compile(
+    r"\b(?:because|since|unless|although|whether)\b"
+    r"|\b(?:and|but|or|so)\s+(?:should|shall|can|could|would|will|do|does|did|is|are|was|what|how|why|when|where|which|who)\b",
+    re.IGNORECASE,
+)
+# Words after an enum value that mark it as a setting rather than part of the query
+MODE_CUE = re.compile(r"\s+(?:search\w*|mode|ranking|matching|match)\b", re.IGNORECASE)
+LIST_SEPARATOR = re.compile(r"\s*(?:,|;|\band\b)\s*", re.IGNORECASE)
+FILLER = re.compile(r"\b(?:%s)\b" % "|".join(sorted(map(re.escape, STOPWORDS), key=len, reverse=True)), re.IGNORECASE)
+
+
+class Route(NamedTuple):
+    tool: str
+    arguments: Dict[str, Any]
+    score: float
+
+
+def stem(word: str) -> str:
+    """Crude suffix stripping so "documents" and "searching" share a keyword with their base form"""
+    for suffix in ("ing", "es", "ed", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def matched_keyword(match: re.Match) -> str:
+    return re.sub(r"\s+", " ", match.group(1).lower())
+
+
+def keywords(text: str) -> List[str]:
+    return [stem(word) for word in WORD.findall(text.lower().replace("_", " ")) if word not in STOPWORDS]
+
+
+def clean(text: str) -> str:
+    """Request text minus filler words and stray punctuation"""
+    text = re.sub(r"[^\w\s,;'&.-]", " ", FILLER.sub(" ", text))
+    text = re.sub(r"\s*[,;][\s,;]*", ", ", re.sub(r"\s+", " ", text))
+    return text.strip(" ,;.-")
+
+
+def blank(text: str, spans: List[Tuple[int, int]]) -> str:
+    """text with each span replaced by spaces, keeping the other offsets"""
+    chars = list(text)
+    for start, end in spans:
+        chars[start:end] = " " * (end - start)
+    return "".join(chars)
+
+
+class IntentRouter:
+    """Keyword scoring plus schema-driven argument extraction over a fixed tool list"""
+
+    def __init__(self, tools: List["Tool"], hints: Optional[Dict[str, List[str]]] = None,
+                 min_score: float = MIN_SCORE, margin: float = MARGIN,
+                 place_arguments: Iterable[str] = PLACE_ARGUMENTS):
+        self.tools = {tool.name: tool for tool in tools}
+        self.min_score = min_score
+        self.margin = margin
+        self.place_arguments = frozenset(place_arguments)
+
+        raw: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for tool in tools:
+            weights = raw[tool.name]
+
+            def add(words: List[str], weight: float) -> None:
+                for word in words:
+                    weights[word] = max(weights.get(word, 0.0), weight)
+
+            add(keywords(tool.description or ""), DESCRIPTION_WEIGHT)
+            for name, prop in (tool.inputSchema or {}).get("properties", {}).items():
+                add(keywords(name), ARGUMENT_WEIGHT)
+                add([stem(str(value).lower()) for value in prop.get("enum", [])], ARGUMENT_WEIGHT)
+            for hint in (hints or {}).get(tool.name, []):
+                add([" ".join(keywords(hint))], HINT_WEIGHT)
+            add(keywords(tool.name), NAME_WEIGHT)
+
+        # Name keywords and hints say which tool is wanted; other keywords only add weight
+        self.cues: Dict[str, set] = defaultdict(set)
+        for tool in tools:
+            self.cues[tool.name].update(keywords(tool.name))
+            self.cues[tool.name].update(filter(None, (" ".join(keywords(hint)) for hint in (hints or {}).get(tool.name, []))))
+
+        # Name keywords mark a tool's subject; naming two subjects is a mixed request
+        self.subjects: Dict[str, set] = defaultdict(set)
+        for tool in tools:
+            for word in keywords(tool.name):
+                self.subjects[word].add(tool.name)
+
+        # keyword -> {tool: weight}, shared keywords split between their tools
+        self.index: Dict[str, Dict[str, float]] = defaultdict(dict)
+        for tool_name, weights in raw.items():
+            for word, weight in weights.items():
+                if word:
+                    self.index[word][tool_name] = weight
+        for postings in self.index.values():
+            for tool_name in postings:
+                postings[tool_name] /= len(postings)
+
+        # One pass over the request finds every keyword; longest first so phrases win
+        alternatives = sorted(self.index, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"\b(%s)\w*" % "|".join(re.escape(word).replace(r"\ ", r"\s+") for word in alternatives),
+            re.IGNORECASE,
+        ) if alternatives else None
+
+    def _matches(self, message: str) -> List[re.Match]:
+        return list(self.pattern.finditer(message)) if self.pattern else []
+
+    def route(self, message: str) -> Optional[Route]:
+        """The tool call for message, or None when the request is ambiguous"""
+        if CLAUSE.search(message):
+            return None
+        matches = self._matches(message)
+        scores: Dict[str, float] = defaultdict(float)
+        seen: set = set()
+        for match in matches:
+            word = matched_keyword(match)
+            if word in seen:
+                continue
+            seen.add(word)
+            for tool_name, weight in self.index[word].items():
+                scores[tool_name] += weight
+
+        candidates = []
+        for tool_name, score in scores.items():
+            if not seen & self.cues[tool_name]:
+                continue
+            extracted = self._arguments(self.tools[tool_name], message, matches)
+            if extracted is not None:
+                arguments, bonus = extracted
+                candidates.append(Route(tool_name, arguments, score + bonus))
+        if not candidates:
+            return None
+
+        candidates.sort(key=lambda route: route.score, reverse=True)
+        best = candidates[0]
+        runner_up = candidates[1].score if len(candidates) > 1 else 0.0
+        if best.score < self.min_score or best.score - runner_up < self.margin:
+            return None
+        if any(self.subjects.get(word) and best.tool not in self.index[word] for word in seen):
+            return None
+        return best
+
+    def _arguments(self, tool: "Tool", message: str, matches: List[re.Match]):
+        """(arguments, bonus) for tool, or None when a required argument is missing"""
+        schema = tool.inputSchema or {}
+        properties = schema.get("properties", {})
+        required = schema.get("required", [])
+        arguments: Dict[str, Any] = {}
+        bonus = 0.0
+
+        # Remove this tool's keywords and counts; what is left describes the subject.
+        # Enum values stay until they are taken as arguments below
+        enum_words = {stem(str(value).lower()) for prop in properties.values() for value in prop.get("enum", [])}
+        spans = []
+        for match in matches:
+            word = matched_keyword(match)
+            if tool.name in self.index[word] and word not in enum_words:
+                spans.append(match.span())
+        for name, prop in properties.items():
+            if prop.get("type") == "integer":
+                count = COUNT.search(message)
+                if count:
+                    value = int(count.group(1) or count.group(2))
+                    arguments[name] = min(value, prop.get("maximum", value))
+                    spans.append(count.span())
+
+        # An enum value inside the query slot is part of the query unless a cue follows it
+        slot = SLOT.search(blank(message, spans))
+        query_start = slot.start(1) if slot else 0
+        for name, prop in properties.items():
+            for value in prop.get("enum", []):
+                for found in re.finditer(r"\b%s\b" % re.escape(str(value)), message, re.IGNORECASE):
+                    cue = MODE_CUE.match(message, found.end())
+                    if cue or found.end() <= query_start:
+                        arguments[name] = value
+                        spans.append((found.start(), cue.end() if cue else found.end()))
+                        break
+                if name in arguments:
+                    break
+        remainder = blank(message, spans)
+        slot = SLOT.search(remainder)
+        # Words before the slot, or before the first cue when there is no slot, that
+        # are not this tool's ask for something else. A place may lead ("Tokyo weather")
+        cue_start = min((m.start() for m in matches if matched_keyword(m) in self.cues[tool.name]), default=0)
+        if clean(remainder[:slot.start() if slot else cue_start]):
+            if slot or not any(name in self.place_arguments for name in required):
+                return None
+        text = slot.group(1) if slot else remainder
+
+        for name in required:
+            if name in arguments:
+                continue
+            prop = properties.get(name, {})
+            is_place = name in self.place_arguments
+            if prop.get("type") == "string":
+                value = clean(text)
+                if not value or (not slot and len(value) < MIN_REMAINDER):
+                    return None
+                if is_place and resolve_place(value) is None:
+                    return None
+                arguments[name] = value
+            elif prop.get("type") == "array":
+                items = [clean(item) for item in LIST_SEPARATOR.split(text)]
+                items = [item for item in items if item]
+                if len(items) < 2:
+                    return None
+                if is_place and any(resolve_place(item) is None for item in items):
+                    return None
+                arguments[name] = items
+                bonus += MULTI_ITEM_BONUS
+            else:
+                return None
+        return arguments, bonus
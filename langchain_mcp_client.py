@@ -9,10 +9,13 @@ except ImportError as e:
     print("Install with: pip install langchain langchain-mcp-adapters langchain-anthropic")
     exit(1)
 
+from langchain_mcp_tools import PooledMCPTools
+
 class LangChainMCPClient:
     def __init__(self, server_command: list[str]):
         self.server_command = server_command
         self.mcp_client = None
+        self.pooled_tools = None
         self.agent = None
     
     async def connect(self):
@@ -26,8 +29,10 @@ class LangChainMCPClient:
             }
         })
         
-        # Get MCP tools
-        tools = await self.mcp_client.get_tools()
+        # Get MCP tools bound to warm, long-lived server sessions
+        # (get_tools() on the client would start a new server for every tool call)
+        self.pooled_tools = PooledMCPTools(self.mcp_client.connections)
+        tools = await self.pooled_tools.get_tools()
         
         # Create LangChain agent with MCP tools
         try:
@@ -45,11 +50,18 @@ class LangChainMCPClient:
         
         result = await self.agent.ainvoke({"input": message})
         return result["output"]
+    
+    async def close(self):
+        if self.pooled_tools:
+            await self.pooled_tools.close()
 
 # Example usage
 async def main():
     client = LangChainMCPClient(["python", "mcp_server.py"])
-    await client.connect()
+    try:
+        await client.connect()
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
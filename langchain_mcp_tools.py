@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+LangChain tools for MultiServerMCPClient connections, backed by warm sessions.
+
+Tools from MultiServerMCPClient.get_tools() open a new stdio session, and so
+spawn a new server process, every time they are invoked. PooledMCPTools takes
+the same connections dict and returns the same LangChain tools (built by
+langchain_mcp_adapters' load_mcp_tools), but every call runs on a SessionPool
+of long-lived, initialized servers per stdio connection. Tool schemas come
+from the on-disk ToolCatalog when the server version matches. Connections
+using other transports are loaded through MultiServerMCPClient as before.
+
+    async with PooledMCPTools(client.connections) as pooled:
+        tools = await pooled.get_tools()
+"""
+from typing import Any, Dict, List, Optional
+
+try:
+    from langchain_core.tools import BaseTool
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+    from langchain_mcp_adapters.tools import load_mcp_tools
+    from mcp import StdioServerParameters
+    from mcp.types import CallToolResult, ListToolsResult
+except ImportError as e:
+    print(f"Missing LangChain MCP: {e}")
+    print("Install with: pip install langchain-mcp-adapters")
+    exit(1)
+
+from mcp_session_pool import SessionPool
+from tool_catalog import ToolCatalog
+
+
+class PoolSession:
+    """The part of ClientSession that load_mcp_tools uses, spread over a SessionPool"""
+
+    def __init__(self, pool: SessionPool):
+        self.pool = pool
+
+    async def list_tools(self, cursor: Optional[str] = None, **kwargs) -> ListToolsResult:
+        if cursor is None and self.pool.tools:
+            return ListToolsResult(tools=self.pool.tools)
+        session = await self.pool.acquire()
+        return await session.list_tools(cursor, **kwargs)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs) -> CallToolResult:
+        return await self.pool.call_tool(name, arguments, **kwargs)
+
+
+class PooledMCPTools:
+    """Session-reusing replacement for MultiServerMCPClient.get_tools()"""
+
+    def __init__(self, connections: Dict[str, Dict[str, Any]], pool_size: int = 2,
+                 catalog: Optional[ToolCatalog] = None):
+        self.connections = connections
+        self.pool_size = pool_size
+        self.catalog = catalog if catalog is not None else ToolCatalog()
+        self.pools: Dict[str, SessionPool] = {}
+        self._tools: Dict[str, List[BaseTool]] = {}
+
+    async def __aenter__(self) -> "PooledMCPTools":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def get_tools(self, server_name: Optional[str] = None) -> List[BaseTool]:
+        """LangChain tools for one server, or for all servers when server_name is None"""
+        names = [server_name] if server_name is not None else list(self.connections)
+        tools: List[BaseTool] = []
+        for name in names:
+            if name not in self._tools:
+                self._tools[name] = await self._load(name)
+            tools.extend(self._tools[name])
+        return tools
+
+    async def _load(self, name: str) -> List[BaseTool]:
+        connection = self.connections[name]
+        if connection.get("transport", "stdio") != "stdio":
+            # Only stdio servers are pooled here
+            return await MultiServerMCPClient({name: connection}).get_tools(server_name=name)
+
+        params = StdioServerParameters(
+            command=connection["command"],
+            args=connection.get("args", []),
+            env=connection.get("env"),
+            cwd=connection.get("cwd"),
+        )
+        pool = SessionPool(params, self.pool_size, catalog=self.catalog)
+        await pool.start()
+        self.pools[name] = pool
+        return await load_mcp_tools(PoolSession(pool))
+
+    async def close(self) -> None:
+        for pool in self.pools.values():
+            await pool.close()
+        self.pools.clear()
+        self._tools.clear()
@@ -3,6 +3,7 @@ try:
     from langchain_mcp_adapters.client import MultiServerMCPClient
     from langgraph.graph import StateGraph, END
     from langgraph.graph.message import add_messages
+    from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
     from langchain_anthropic import ChatAnthropic
     from typing import Annotated, TypedDict
     print("LangGraph MCP adapter loaded successfully")
@@ -11,12 +12,120 @@ except ImportError as e:
     print("Install with: pip install langgraph langchain-mcp-adapters langchain-anthropic")
     exit(1)
 
+from langchain_mcp_tools import PooledMCPTools
+
+# Tool calls from one model turn run concurrently, at most this many at once
+TOOL_CONCURRENCY = 8
+# Seconds before a single tool call is abandoned
+TOOL_TIMEOUT = 30.0
+# Approximate token budget for the history sent to the model each turn
+CONTEXT_TOKEN_BUDGET = 8000
+# Most recent rounds (a message plus the tool results answering it) kept verbatim
+KEEP_RAW_ROUNDS = 4
+# Characters kept from tool results in older rounds
+TOOL_PREVIEW_CHARS = 400
+
 class State(TypedDict):
     messages: Annotated[list, add_messages]
 
+class ParallelToolNode:
+    """Graph node that runs every tool call of the last model message concurrently.
+    
+    Results come back as ToolMessages in the order the model made the calls;
+    failures and timeouts become error ToolMessages the model can react to.
+    """
+    
+    def __init__(self, tools: list, max_concurrency: int = TOOL_CONCURRENCY, timeout: float = TOOL_TIMEOUT):
+        self.tools = {tool.name: tool for tool in tools}
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def __call__(self, state: State):
+        calls = state["messages"][-1].tool_calls
+        return {"messages": list(await asyncio.gather(*(self._run(call) for call in calls)))}
+    
+    async def _run(self, call) -> ToolMessage:
+        tool = self.tools.get(call["name"])
+        if tool is None:
+            return self._error(call, f"Unknown tool: {call['name']}")
+        async with self._semaphore:
+            try:
+                result = await asyncio.wait_for(tool.ainvoke(call["args"]), self.timeout)
+            except asyncio.TimeoutError:
+                return self._error(call, f"{call['name']} timed out after {self.timeout}s")
+            except Exception as e:
+                return self._error(call, f"{call['name']} failed: {e}")
+        content = result if isinstance(result, (str, list)) else str(result)
+        return ToolMessage(content=content, tool_call_id=call["id"], name=call["name"])
+    
+    @staticmethod
+    def _error(call, message: str) -> ToolMessage:
+        return ToolMessage(content=f"Error: {message}", tool_call_id=call["id"], name=call["name"], status="error")
+
+def route_tools(state: State):
+    """Send the turn to the tool node when the model asked for tools"""
+    return "tools" if getattr(state["messages"][-1], "tool_calls", None) else END
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block if isinstance(block, str) else str(block.get("text", "")) for block in content)
+
+def approx_tokens(message) -> int:
+    """Rough token count (4 characters per token) of a message and its tool calls"""
+    size = len(_text(message.content)) + len(str(getattr(message, "tool_calls", None) or ""))
+    return size // 4 + 4
+
+def compact_messages(messages: list, budget: int = CONTEXT_TOKEN_BUDGET,
+                     keep_rounds: int = KEEP_RAW_ROUNDS, preview_chars: int = TOOL_PREVIEW_CHARS) -> list:
+    """State updates that keep the history within budget.
+    
+    Tool results outside the last keep_rounds rounds are cut to a preview
+    (replaced in place by message id). If the history is still over budget,
+    the oldest rounds are removed whole, so a tool call is never separated
+    from its results; a leading system or human prompt is always kept.
+    """
+    rounds = []
+    for message in messages:
+        if isinstance(message, ToolMessage) and rounds:
+            rounds[-1].append(message)
+        else:
+            rounds.append([message])
+    old = rounds[:-keep_rounds] if keep_rounds else rounds
+    
+    updates = []
+    sizes = [[approx_tokens(m) for m in r] for r in rounds]
+    for i, group in enumerate(old):
+        for j, message in enumerate(group):
+            text = _text(message.content)
+            if not isinstance(message, ToolMessage) or message.additional_kwargs.get("compacted") or len(text) <= preview_chars:
+                continue
+            preview = message.model_copy(update={
+                "content": f"{text[:preview_chars]}\n... [{len(text) - preview_chars} characters of earlier tool output omitted]",
+                "additional_kwargs": {**message.additional_kwargs, "compacted": True},
+            })
+            updates.append(preview)
+            sizes[i][j] = approx_tokens(preview)
+    
+    total = sum(map(sum, sizes))
+    first = 1 if rounds and isinstance(rounds[0][0], (SystemMessage, HumanMessage)) else 0
+    for i in range(first, len(old)):
+        if total <= budget:
+            break
+        total -= sum(sizes[i])
+        dropped = {message.id for message in rounds[i]}
+        updates = [m for m in updates if m.id not in dropped]
+        updates.extend(RemoveMessage(id=message.id) for message in rounds[i])
+    return updates
+
+def compact_history(state: State):
+    """Graph node: bound the history before every model call"""
+    return {"messages": compact_messages(state["messages"])}
+
 class LangGraphMCPClient:
     def __init__(self):
         self.mcp_client = None
+        self.pooled_tools = None
         self.graph = None
     
     async def connect_and_test(self):
@@ -30,8 +139,10 @@ class LangGraphMCPClient:
             }
         })
         
-        # Get MCP tools
-        tools = await self.mcp_client.get_tools()
+        # Get MCP tools bound to warm, long-lived server sessions
+        # (get_tools() on the client would start a new server for every tool call)
+        self.pooled_tools = PooledMCPTools(self.mcp_client.connections)
+        tools = await self.pooled_tools.get_tools()
         
         # Create LLM with tools
         try:
@@ -44,9 +155,13 @@ class LangGraphMCPClient:
                 response = llm.invoke(state["messages"])
                 return {"messages": [response]}
             
+            workflow.add_node("compact", compact_history)
             workflow.add_node("model", call_model)
-            workflow.set_entry_point("model")
-            workflow.add_edge("model", END)
+            workflow.add_node("tools", ParallelToolNode(tools))
+            workflow.set_entry_point("compact")
+            workflow.add_edge("compact", "model")
+            workflow.add_conditional_edges("model", route_tools, ["tools", END])
+            workflow.add_edge("tools", "compact")
             
             self.graph = workflow.compile()
             
@@ -61,22 +176,28 @@ class LangGraphMCPClient:
             print(f"LLM setup failed: {e}. Set ANTHROPIC_API_KEY environment variable.")
             print("Testing MCP tools directly...")
             
-            # Test tools directly without LLM
-            for tool in tools:
-                if hasattr(tool, 'name'):
-                    if tool.name == "get_weather":
-                        result = await tool.ainvoke({"location": "Tokyo"})
-                        print(f"Weather result: {result}")
-                    elif tool.name == "search_documents":
-                        result = await tool.ainvoke({"query": "AI", "limit": 3})
-                        print(f"Search result: {result}")
+            # Run a model-style turn with two tool calls through the parallel tool node
+            turn = AIMessage(content="", tool_calls=[
+                {"name": "search_documents", "args": {"query": "AI", "limit": 3}, "id": "call_search"},
+                {"name": "get_weather", "args": {"location": "Tokyo"}, "id": "call_weather"},
+            ])
+            result = await ParallelToolNode(tools)({"messages": [turn]})
+            for message in result["messages"]:
+                print(f"{message.name} result: {message.content}")
         
         print("✓ LangGraph MCP integration working!")
+    
+    async def close(self):
+        if self.pooled_tools:
+            await self.pooled_tools.close()
 
 # Example usage
 async def main():
     client = LangGraphMCPClient()
-    await client.connect_and_test()
+    try:
+        await client.connect_and_test()
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -10,6 +10,8 @@ except ImportError as e:
     print("Install with: pip install mcp llama-index llama-index-llms-anthropic")
     exit(1)
 
+from mcp_session_pool import result_text
+
 class LlamaIndexMCPClient:
     def __init__(self):
         self.session = None
@@ -29,11 +31,11 @@ class LlamaIndexMCPClient:
                 
                 # Test weather tool
                 weather_result = await session.call_tool("get_weather", {"location": "San Francisco"})
-                print(f"Weather result: {weather_result.content[0].text}")
+                print(f"Weather result: {result_text(weather_result)}")
                 
                 # Test search tool
                 search_result = await session.call_tool("search_documents", {"query": "machine learning", "limit": 5})
-                print(f"Search result: {search_result.content[0].text}")
+                print(f"Search result: {result_text(search_result)}")
                 
                 print("✓ LlamaIndex MCP integration working!")
 
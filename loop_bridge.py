@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Background event loop for calling async MCP sessions from synchronous code.
+
+An MCP ClientSession is bound to the event loop it was opened on. LangChain
+and similar frameworks call tools synchronously, often from worker threads or
+from code already running inside another loop, where run_until_complete
+fails or serializes every call. A LoopThread runs one event loop in a daemon
+thread that owns the session; any thread submits coroutines to it and waits
+on the result, and concurrent submissions run concurrently on that loop.
+
+    bridge = LoopThread()
+    session = bridge.run(open_session())             # opened on the bridge loop
+    text = bridge.run(session.call_tool("get_weather", {"location": "Tokyo"}))
+    bridge.stop()
+"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class LoopThread:
+    """An asyncio event loop running forever in its own daemon thread"""
+
+    def __init__(self, name: str = "mcp-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule coro on the bridge loop from any thread"""
+        if not self.running:
+            coro.close()
+            raise RuntimeError("Event loop thread is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run coro on the bridge loop and block the calling thread for its result"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("LoopThread.run() would deadlock when called from its own loop; await the coroutine instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Call did not finish within {timeout}s") from None
+
+    async def run_async(self, coro: Coroutine) -> Any:
+        """Await coro on the bridge loop from any other event loop"""
+        if self.in_loop_thread():
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Cancel outstanding tasks, stop the loop and join the thread"""
+        if not self.running:
+            return
+
+        async def cancel_tasks():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self.submit(cancel_tasks()).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
@@ -1,64 +1,283 @@
 #!/usr/bin/env python3
+"""
+Standard (low-level SDK) MCP server with sample tools.
+
+Serves over stdio by default. With --transport http it serves streamable
+HTTP at /mcp, optionally across several worker processes:
+  python mcp_server.py --transport http --port 8000 --workers 4
+"""
+import argparse
 import asyncio
-import json
-from typing import Any, Dict, List
+import contextlib
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
 try:
     from mcp.server import Server
     from mcp.server.stdio import stdio_server
-    from mcp.types import Tool, TextContent
+    from mcp.types import CallToolResult, Tool, TextContent
 except ImportError:
     print("MCP not installed. Install with: pip install mcp")
     exit(1)
 
-app = Server("framework-mcp-server")
+from admission import Overloaded
+from search_index import search_page, start_background_merger, warm_up
+from tool_catalog import schema_version
+from tool_registry import ToolExecutor, ToolRegistry
+from weather import close_http_client, get_weather, get_weather_batch
 
-@app.list_tools()
-async def list_tools() -> List[Tool]:
-    return [
-        Tool(
-            name="search_documents",
-            description="Search through documents",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "Search query"},
-                    "limit": {"type": "integer", "description": "Max results", "default": 10}
-                },
-                "required": ["query"]
+registry = ToolRegistry(ToolExecutor(process_initializer=warm_up))
+
+@registry.tool(
+    name="search_documents",
+    description="Search through documents. Results are paged; pass the returned cursor to get more.",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "query": {"type": "string", "description": "Search query"},
+            "limit": {"type": "integer", "description": "Max results", "default": 10, "minimum": 1},
+            "mode": {
+                "type": "string",
+                "enum": ["keyword", "semantic"],
+                "description": "keyword (BM25) or semantic (embedding similarity) ranking",
+                "default": "keyword"
+            },
+            "cursor": {
+                "type": "string",
+                "description": "Opaque cursor from a previous result page to fetch the next page"
             }
-        ),
-        Tool(
-            name="get_weather",
-            description="Get weather information",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "location": {"type": "string", "description": "Location name"}
-                },
-                "required": ["location"]
+        },
+        "required": ["query"]
+    },
+    # Scoring is CPU-bound: keep it off the event loop
+    execution="process",
+    concurrency=8,
+    max_queue=32
+)
+def search_documents_tool(arguments: Dict[str, Any]) -> List[TextContent]:
+    page = search_page(arguments["query"], arguments["limit"], arguments["mode"], arguments.get("cursor"))
+    return [TextContent(type="text", text=chunk) for chunk in page.chunks()]
+
+@registry.tool(
+    name="get_weather",
+    description="Get weather information",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "location": {"type": "string", "description": "Location name"}
+        },
+        "required": ["location"]
+    }
+)
+async def get_weather_tool(arguments: Dict[str, Any]) -> List[TextContent]:
+    report = await get_weather(arguments["location"])
+    return [TextContent(type="text", text=report)]
+
+@registry.tool(
+    name="get_weather_batch",
+    description="Get weather information for many locations in one call",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "locations": {
+                "type": "array",
+                "items": {"type": "string"},
+                "minItems": 1,
+                "maxItems": 100,
+                "description": "Location names"
             }
+        },
+        "required": ["locations"]
+    },
+    concurrency=4,
+    max_queue=16,
+    priority="batch"
+)
+async def get_weather_batch_tool(arguments: Dict[str, Any]) -> List[TextContent]:
+    reports = await get_weather_batch(arguments["locations"])
+    return [TextContent(type="text", text="\n".join(reports))]
+
+# The version is a hash of the tool schemas, so client tool catalogs notice changes
+app = Server("framework-mcp-server", version=schema_version(registry.list_tools()))
+
+@app.list_tools()
+async def list_tools() -> List[Tool]:
+    return registry.list_tools()
+
+def request_deadline(meta) -> Optional[float]:
+    """Absolute deadline from _meta.deadline (epoch seconds) or _meta.timeoutMs"""
+    deadline = getattr(meta, "deadline", None)
+    if deadline is not None:
+        return float(deadline)
+    timeout_ms = getattr(meta, "timeoutMs", None)
+    if timeout_ms is not None:
+        return time.time() + float(timeout_ms) / 1000
+    return None
+
+# Tool calls running for the stateless HTTP request being served, if any
+http_request_calls: ContextVar[Optional[Set[asyncio.Task]]] = ContextVar("http_request_calls", default=None)
+
+# Arguments are checked by the registry's precompiled validators instead of
+# per-call jsonschema validation in the SDK. A notifications/cancelled from
+# the client (or, over stateless HTTP, the client disconnecting) cancels this
+# handler, which stops the tool's work as well.
+@app.call_tool(validate_input=False)
+async def call_tool(name: str, arguments: Dict[str, Any]):
+    # Clients rank calls with _meta.priority: "interactive" (default) or "batch"
+    # and bound them with _meta.timeoutMs or _meta.deadline
+    meta = app.request_context.meta
+    calls = http_request_calls.get()
+    task = asyncio.current_task()
+    if calls is not None:
+        calls.add(task)
+    try:
+        content = await registry.call(name, arguments, getattr(meta, "priority", None), request_deadline(meta))
+    except Overloaded as e:
+        return CallToolResult(
+            content=[TextContent(type="text", text=str(e))],
+            isError=True,
+            _meta={"retryable": True, "retryAfter": round(e.retry_after, 3)},
         )
-    ]
-
-@app.call_tool()
-async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
-    if name == "search_documents":
-        query = arguments["query"]
-        limit = arguments.get("limit", 10)
-        results = f"Found {limit} documents matching '{query}'"
-        return [TextContent(type="text", text=results)]
-    
-    elif name == "get_weather":
-        location = arguments["location"]
-        weather = f"Weather in {location}: 72°F, sunny"
-        return [TextContent(type="text", text=weather)]
-    
-    else:
-        raise ValueError(f"Unknown tool: {name}")
+    finally:
+        if calls is not None:
+            calls.discard(task)
+    return content
+
+class StreamableHTTPApp:
+    """ASGI endpoint handing /mcp requests to the session manager.
+
+    In stateless mode a notifications/cancelled arrives as a separate HTTP
+    request, handled by a fresh transport (often in another worker) that
+    cannot see the call it names. Calls are cancelled instead when the client
+    that made them disconnects, so abandoning the request stops the work.
+    """
+
+    def __init__(self, session_manager):
+        self.session_manager = session_manager
 
-async def main():
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+    async def __call__(self, scope, receive, send):
+        if not self.session_manager.stateless:
+            await self.session_manager.handle_request(scope, receive, send)
+            return
+
+        # The server task for this request inherits the context, and with it the set
+        calls: Set[asyncio.Task] = set()
+        http_request_calls.set(calls)
+        watcher: Optional[asyncio.Task] = None
+
+        def cancel_calls():
+            for task in list(calls):
+                task.cancel()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            cancel_calls()
+
+        async def tracked_receive():
+            nonlocal watcher
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                cancel_calls()
+            elif self.session_manager.json_response and not message.get("more_body") and watcher is None:
+                # SSE responses listen for the disconnect themselves; a JSON
+                # response only waits for the result, so watch once the body is read
+                watcher = asyncio.ensure_future(watch_disconnect())
+            return message
+
+        try:
+            await self.session_manager.handle_request(scope, tracked_receive, send)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            # Whatever is still running has nobody left to answer
+            cancel_calls()
+
+def create_http_app():
+    """Build the ASGI app for one HTTP worker process.
+
+    Each worker owns its own session manager, caches and index readers. In
+    stateless mode (the default) every request carries everything needed to
+    serve it, so any worker behind the shared port can answer it.
+    """
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    session_manager = StreamableHTTPSessionManager(
+        app=app,
+        stateless=os.environ.get("MCP_HTTP_STATELESS", "1") == "1",
+        json_response=os.environ.get("MCP_HTTP_JSON_RESPONSE", "0") == "1",
+    )
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_):
+        start_background_merger()
+        registry.executor.start()
+        async with session_manager.run():
+            try:
+                yield
+            finally:
+                await close_http_client()
+                registry.executor.shutdown()
+
+    return Starlette(
+        routes=[Route("/mcp", endpoint=StreamableHTTPApp(session_manager), methods=["GET", "POST", "DELETE"])],
+        lifespan=lifespan,
+    )
+
+def run_http(host: str, port: int, workers: int, stateful: bool, json_response: bool):
+    """Serve streamable HTTP on one port with N worker processes"""
+    import uvicorn
+
+    if stateful and workers > 1:
+        raise SystemExit("--stateful keeps sessions in process memory and needs --workers 1")
+    # Workers are separate processes, so settings travel through the environment
+    os.environ["MCP_HTTP_STATELESS"] = "0" if stateful else "1"
+    os.environ["MCP_HTTP_JSON_RESPONSE"] = "1" if json_response else "0"
+    # Each worker starts its own tool process pool; size them to share the CPUs
+    os.environ["MCP_HTTP_WORKERS"] = str(workers)
+    uvicorn.run(
+        "mcp_server:create_http_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+async def run_stdio():
+    # Fold segments written by ingest.py together while serving queries
+    start_background_merger()
+    registry.executor.start()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+    finally:
+        await close_http_client()
+        registry.executor.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Framework MCP server")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio",
+                        help="http is stateless unless --stateful: calls are cancelled by closing their "
+                             "request, not by notifications/cancelled")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP bind address")
+    parser.add_argument("--port", type=int, default=8000, help="HTTP port")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="HTTP worker processes; each gets CPU count / workers tool processes "
+                             "unless MCP_PROCESS_WORKERS is set")
+    parser.add_argument("--stateful", action="store_true",
+                        help="Keep MCP sessions between HTTP requests (single worker only)")
+    parser.add_argument("--json-response", action="store_true",
+                        help="Answer with plain JSON instead of SSE streams")
+    args = parser.parse_args()
+
+    if args.transport == "http":
+        run_http(args.host, args.port, args.workers, args.stateful, args.json_response)
+    else:
+        asyncio.run(run_stdio())
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
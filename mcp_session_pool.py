@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Pool of warm, initialized MCP server sessions.
+
+Spawning `python mcp_server.py` and running initialize/list_tools costs
+hundreds of milliseconds per connection. A SessionPool pays that once: it
+keeps N server processes with initialized ClientSessions open and hands them
+out round-robin (a ClientSession multiplexes concurrent requests, so leases
+are shared, not exclusive). A session leaves the rotation as soon as its
+server's output stream closes, and its pending calls fail with "connection
+closed"; a health loop also pings every session and replaces servers that
+stopped answering.
+
+Each session's stdio_client/ClientSession contexts are entered and exited by
+one dedicated task, as anyio requires, so sessions can be opened and closed
+from any task. With a ToolCatalog, sessions take their tool list from the
+on-disk catalog instead of calling list_tools on every start.
+
+ResilientSession builds on the same pieces for clients that want a single
+long-lived connection: keep-alive pings, reconnects with exponential backoff,
+and calls that failed because the server went away are retried on the new
+session.
+
+    pool = SessionPool(StdioServerParameters(command="python", args=["mcp_server.py"]), size=4)
+    await pool.start()
+    result = await pool.call_tool("get_weather", {"location": "Tokyo"})
+    await pool.close()
+"""
+import asyncio
+import random
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, CallToolResult, ErrorData, Tool
+
+from tool_catalog import CatalogTracker, ToolCatalog, server_identity
+
+HEALTH_INTERVAL = 15.0
+PING_TIMEOUT = 5.0
+START_TIMEOUT = 30.0
+# Reconnect backoff: first delay and cap, in seconds
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 15.0
+# Failed starts before a reconnect gives up and waiting calls get the error
+RECONNECT_ATTEMPTS = 5
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """True when a call failed because the server connection is gone"""
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream))
+
+
+def result_text(result: CallToolResult) -> str:
+    """All text parts of a tool result; large results arrive as several chunks"""
+    return "\n".join(content.text for content in result.content if content.type == "text")
+
+
+class PooledSession:
+    """One server process with an initialized ClientSession"""
+
+    def __init__(self, params: StdioServerParameters, session_kwargs: Optional[Dict[str, Any]] = None,
+                 catalog: Optional[ToolCatalog] = None):
+        self.params = params
+        self.tracker = CatalogTracker(server_identity(params), catalog)
+        self.session_kwargs = {"message_handler": self.tracker.message_handler, **(session_kwargs or {})}
+        self.session: Optional[ClientSession] = None
+        self.server_info = None
+        self.healthy = False
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        # Set once the session's contexts have exited, for whatever reason
+        self.closed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def start(self, timeout: float = START_TIMEOUT) -> "PooledSession":
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise RuntimeError(f"MCP server did not start within {timeout}s") from None
+        except asyncio.CancelledError:
+            # Do not leave a half-started server behind the cancelled caller
+            await asyncio.shield(self.close())
+            raise
+        if self._error is not None:
+            raise RuntimeError(f"MCP server failed to start: {self._error}") from self._error
+        return self
+
+    async def _run(self) -> None:
+        try:
+            async with stdio_client(self.params) as (read_stream, write_stream):
+                # Messages pass through a forwarding task so the end of the
+                # server's output is seen at once, not at the next ping
+                tap_send, tap_receive = anyio.create_memory_object_stream(0)
+                async with anyio.create_task_group() as tg:
+                    tg.start_soon(self._forward, read_stream, tap_send)
+                    async with ClientSession(tap_receive, write_stream, **self.session_kwargs) as session:
+                        init = await session.initialize()
+                        self.server_info = init.serverInfo
+                        await self.tracker.attach(session, init)
+                        self.session = session
+                        self.healthy = True
+                        self._ready.set()
+                        try:
+                            await self._stop.wait()
+                        finally:
+                            self.healthy = False
+                            await self.tracker.close()
+                    tg.cancel_scope.cancel()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.healthy = False
+            self._ready.set()
+            self.closed.set()
+
+    async def _forward(self, read_stream, tap_send) -> None:
+        try:
+            async with tap_send:
+                async for message in read_stream:
+                    await tap_send.send(message)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            pass
+        finally:
+            # The server is gone: leave the rotation and shut the session down,
+            # which fails its pending requests with CONNECTION_CLOSED
+            self.healthy = False
+            self._stop.set()
+
+    @property
+    def tools(self) -> List[Tool]:
+        return self.tracker.tools
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs) -> CallToolResult:
+        """call_tool on this session that fails with CONNECTION_CLOSED instead of hanging when it closes"""
+        if not self.healthy or self.session is None:
+            raise McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed"))
+        # A request sent just as the connection drops can miss the session's
+        # "connection closed" errors and wait forever; give up when it exits
+        call = asyncio.ensure_future(self.session.call_tool(name, arguments, **kwargs))
+        closed = asyncio.ensure_future(self.closed.wait())
+        try:
+            await asyncio.wait((call, closed), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not call.done():
+                call.cancel()
+        if not call.done() or call.cancelled():
+            await asyncio.gather(call, return_exceptions=True)
+            raise McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed"))
+        return call.result()
+
+    async def ping(self, timeout: float = PING_TIMEOUT) -> bool:
+        """Round-trip a ping; marks the session unhealthy if it fails"""
+        if not self.healthy or self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+        except Exception:
+            self.healthy = False
+        return self.healthy
+
+    async def close(self) -> None:
+        self.healthy = False
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, PING_TIMEOUT)
+            except Exception:
+                self._task.cancel()
+            self._task = None
+
+
+class SessionPool:
+    """Round-robin pool of warm MCP sessions with health checks"""
+
+    def __init__(self, params: StdioServerParameters, size: int = 2,
+                 health_interval: float = HEALTH_INTERVAL, session_kwargs: Optional[Dict[str, Any]] = None,
+                 catalog: Optional[ToolCatalog] = None):
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self.params = params
+        self.size = size
+        self.health_interval = health_interval
+        self.session_kwargs = session_kwargs
+        self.catalog = catalog
+        self._sessions: List[Optional[PooledSession]] = [None] * size
+        self._replacing: Dict[int, asyncio.Task] = {}
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self.replaced = 0
+
+    async def __aenter__(self) -> "SessionPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Spawn and initialize all sessions concurrently"""
+        async with self._start_lock:
+            if self._started:
+                return
+            sessions = await asyncio.gather(
+                *(self._new_session().start() for _ in range(self.size)),
+                return_exceptions=True,
+            )
+            failures = [s for s in sessions if isinstance(s, BaseException)]
+            if len(failures) == self.size:
+                raise failures[0]
+            for i, session in enumerate(sessions):
+                if isinstance(session, BaseException):
+                    self._replace(i)
+                else:
+                    self._sessions[i] = session
+            self._started = True
+            if self.health_interval:
+                self._health_task = asyncio.create_task(self._health_loop())
+
+    @property
+    def tools(self) -> List[Tool]:
+        """Tool list reported by a healthy session"""
+        for pooled in self._sessions:
+            if pooled is not None and pooled.healthy:
+                return pooled.tools
+        return []
+
+    def _new_session(self) -> PooledSession:
+        return PooledSession(self.params, self.session_kwargs, self.catalog)
+
+    def _healthy_indexes(self) -> List[int]:
+        healthy = []
+        for i, s in enumerate(self._sessions):
+            if s is not None and s.healthy:
+                healthy.append(i)
+            elif s is not None:
+                # Its server went away since the last lease: bring up a new one
+                self._replace(i)
+        return healthy
+
+    async def acquire(self) -> ClientSession:
+        """Return the next healthy session, round-robin"""
+        return (await self.lease())[1].session
+
+    async def lease(self) -> Tuple[int, PooledSession]:
+        if not self._started:
+            await self.start()
+        healthy = self._healthy_indexes()
+        if not healthy:
+            # Every server is down: wait for a replacement to come up
+            for i in range(self.size):
+                self._replace(i)
+            await asyncio.gather(*self._replacing.values(), return_exceptions=True)
+            healthy = self._healthy_indexes()
+            if not healthy:
+                raise RuntimeError("No healthy MCP server sessions available")
+        index = healthy[self._next % len(healthy)]
+        self._next += 1
+        return index, self._sessions[index]
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        retries: int = 1, **kwargs) -> CallToolResult:
+        """call_tool on the next healthy session; on a connection error, retry on another lease"""
+        for attempt in range(retries + 1):
+            _, pooled = await self.lease()
+            try:
+                return await pooled.call_tool(name, arguments, **kwargs)
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                self.mark_failed(pooled)
+                if attempt == retries:
+                    raise
+
+    def mark_failed(self, pooled: PooledSession) -> None:
+        """Take a session out of rotation and start a replacement"""
+        pooled.healthy = False
+        for i, s in enumerate(self._sessions):
+            if s is pooled:
+                self._replace(i)
+
+    def _replace(self, index: int) -> None:
+        if index in self._replacing:
+            return
+        self._replacing[index] = asyncio.create_task(self._replace_session(index))
+
+    async def _replace_session(self, index: int) -> None:
+        old = self._sessions[index]
+        try:
+            if old is not None:
+                await old.close()
+            self._sessions[index] = await self._new_session().start()
+            self.replaced += 1
+        except Exception as e:
+            print(f"Failed to restart MCP server session: {e}", file=sys.stderr)
+            self._sessions[index] = None
+        finally:
+            self._replacing.pop(index, None)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    async def check_health(self) -> None:
+        """Ping every session and replace the ones that do not answer"""
+        sessions = list(enumerate(self._sessions))
+        results = await asyncio.gather(*(s.ping() if s else asyncio.sleep(0, False) for _, s in sessions))
+        for (i, _), ok in zip(sessions, results):
+            if not ok:
+                self._replace(i)
+
+    async def close(self) -> None:
+        # Stop the tasks that could start new sessions first, and wait for
+        # them, so no server is started behind close()
+        tasks = list(self._replacing.values())
+        if self._health_task is not None:
+            tasks.append(self._health_task)
+            self._health_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(s.close() for s in self._sessions if s is not None), return_exceptions=True)
+        self._sessions = [None] * self.size
+        self._started = False
+
+
+class ResilientSession:
+    """One long-lived server session that heals itself.
+
+    A keep-alive loop pings the server; when a ping or a call finds the
+    connection gone, a single reconnect runs with exponential backoff and
+    jitter while callers wait for it. After reconnect_attempts failed starts
+    the waiting calls raise, and the next call starts a new reconnect. Calls
+    that failed because of the connection are retried on the new session up
+    to max_retries times, so the server may see such a call twice.
+    """
+
+    def __init__(self, params: StdioServerParameters, keepalive: float = HEALTH_INTERVAL,
+                 max_retries: int = 2, catalog: Optional[ToolCatalog] = None,
+                 session_kwargs: Optional[Dict[str, Any]] = None,
+                 reconnect_attempts: int = RECONNECT_ATTEMPTS):
+        self.params = params
+        self.keepalive = keepalive
+        self.max_retries = max_retries
+        self.reconnect_attempts = max(1, reconnect_attempts)
+        self.catalog = catalog
+        self.session_kwargs = session_kwargs
+        self.reconnects = 0
+        self._current: Optional[PooledSession] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def __aenter__(self) -> "ResilientSession":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> "ResilientSession":
+        self._closed = False
+        self._current = await self._new_session().start()
+        if self.keepalive:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+        return self
+
+    def _new_session(self) -> PooledSession:
+        return PooledSession(self.params, self.session_kwargs, self.catalog)
+
+    @property
+    def tools(self) -> List[Tool]:
+        return self._current.tools if self._current else []
+
+    @property
+    def connected(self) -> bool:
+        return self._current is not None and self._current.healthy
+
+    async def session(self) -> ClientSession:
+        """The live ClientSession, waiting for a reconnect if one is needed"""
+        return (await self._live()).session
+
+    async def _live(self) -> PooledSession:
+        while not self.connected:
+            if self._closed:
+                raise RuntimeError("MCP session is closed")
+            self._start_reconnect()
+            error = await asyncio.shield(self._reconnect_task)
+            if error is not None:
+                raise ConnectionError(f"MCP server unavailable after {self.reconnect_attempts} "
+                                      f"reconnect attempts: {error}") from error
+        return self._current
+
+    def _start_reconnect(self) -> None:
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> Optional[Exception]:
+        """Start a new session; returns the last error if every attempt failed"""
+        old, self._current = self._current, None
+        if old is not None:
+            await old.close()
+        delay = BACKOFF_INITIAL
+        error = None
+        for attempt in range(self.reconnect_attempts):
+            if self._closed:
+                return None
+            try:
+                self._current = await self._new_session().start()
+                self.reconnects += 1
+                return None
+            except Exception as e:
+                error = e
+                if attempt + 1 == self.reconnect_attempts:
+                    break
+                print(f"MCP reconnect failed ({e}); retrying in {delay:.1f}s", file=sys.stderr)
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+                delay = min(delay * 2, BACKOFF_MAX)
+        print(f"MCP reconnect gave up after {self.reconnect_attempts} attempts ({error})", file=sys.stderr)
+        return error
+
+    async def _keepalive_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.keepalive)
+            if self._current is not None and not await self._current.ping():
+                self._start_reconnect()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs) -> CallToolResult:
+        """call_tool on the live session, retrying on a new one if the server went away"""
+        for attempt in range(self.max_retries + 1):
+            pooled = await self._live()
+            try:
+                return await pooled.call_tool(name, arguments, **kwargs)
+            except Exception as e:
+                if not is_connection_error(e) or attempt == self.max_retries:
+                    raise
+                pooled.healthy = False
+
+    async def close(self) -> None:
+        self._closed = True
+        for task in (self._keepalive_task, self._reconnect_task):
+            if task is not None and not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._keepalive_task = self._reconnect_task = None
+        if self._current is not None:
+            await self._current.close()
+            self._current = None
+
+
+_shared_pools: Dict[Tuple[str, Tuple[str, ...]], SessionPool] = {}
+
+
+def get_shared_pool(params: StdioServerParameters, size: int = 2,
+                    catalog: Optional[ToolCatalog] = None) -> SessionPool:
+    """Process-wide pool per server command, so short-lived clients reuse warm servers"""
+    key = (params.command, tuple(params.args))
+    pool = _shared_pools.get(key)
+    if pool is None:
+        pool = _shared_pools[key] = SessionPool(params, size, catalog=catalog)
+    return pool
+
+
+async def close_shared_pools() -> None:
+    pools = list(_shared_pools.values())
+    _shared_pools.clear()
+    await asyncio.gather(*(pool.close() for pool in pools), return_exceptions=True)
@@ -5,48 +5,111 @@ without external framework dependencies.
 """
 import asyncio
 import json
-from typing import Dict, Any, List
+import shlex
+from typing import Dict, Any, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 try:
-    from mcp import ClientSession, StdioServerParameters
-    from mcp.client.stdio import stdio_client
+    from mcp import StdioServerParameters
+    from mcp.types import CallToolResult
 except ImportError:
     print("MCP not installed. Install with: pip install mcp")
     exit(1)
 
+from cache import ToolResultCache
+from mcp_session_pool import SessionPool, close_shared_pools, get_shared_pool, result_text
+from tool_catalog import ToolCatalog
+
+# Seconds before a single call in call_many is abandoned and reported as an error
+CALL_TIMEOUT = 30.0
+
+class ToolCallResult(NamedTuple):
+    """Outcome of one call in call_many: text on success, error otherwise"""
+    tool: str
+    arguments: Dict[str, Any]
+    text: Optional[str]
+    error: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 class MinimalMCPClient:
-    def __init__(self, server_command: List[str]):
+    def __init__(self, server_command: Union[str, List[str]] = "python mcp_server.py",
+                 pool: Optional[SessionPool] = None, pool_size: int = 2,
+                 result_cache: Optional[ToolResultCache] = None):
         self.server_command = server_command
+        self.pool = pool
+        self.pool_size = pool_size
+        # Optional client-side cache of tool results (see cache.ToolResultCache)
+        self.result_cache = result_cache
         self.session = None
         self.available_tools = []
     
+    def server_params(self) -> StdioServerParameters:
+        command = shlex.split(self.server_command) if isinstance(self.server_command, str) else list(self.server_command)
+        return StdioServerParameters(command=command[0], args=command[1:])
+    
     async def connect(self):
-        """Connect to MCP server and get available tools"""
-        server_params = StdioServerParameters(
-            command="python",
-            args=["mcp_server.py"]
-        )
-        
-        # Use async context manager properly
-        session_context = stdio_client(server_params)
-        self.session = await session_context.__aenter__()
-        await self.session.initialize()
-        
-        # Get available tools
-        tools_response = await self.session.list_tools()
-        self.available_tools = [tool.name for tool in tools_response.tools]
+        """Lease a warm session from the server pool and get available tools.
+
+        Clients for the same server command share one process-wide pool, so
+        only the first connect pays for spawning and initializing servers.
+        """
+        if self.pool is None:
+            self.pool = get_shared_pool(self.server_params(), self.pool_size, catalog=ToolCatalog())
+        self.session = await self.pool.acquire()
+        self.available_tools = [tool.name for tool in self.pool.tools]
         print(f"Connected to MCP server. Available tools: {self.available_tools}")
     
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
-        """Call a specific MCP tool"""
+    async def _call(self, tool_name: str, arguments: Dict[str, Any]) -> CallToolResult:
         if not self.session:
             raise RuntimeError("Not connected. Call connect() first.")
         
+        if tool_name not in self.available_tools:
+            # The server may have announced new tools since connect
+            self.available_tools = [tool.name for tool in self.pool.tools]
         if tool_name not in self.available_tools:
             raise ValueError(f"Tool '{tool_name}' not available. Available: {self.available_tools}")
         
-        result = await self.session.call_tool(tool_name, arguments)
-        return result.content[0].text if result.content else ""
+        async def send() -> CallToolResult:
+            # Take the next pooled session for each call so load spreads across
+            # servers; a call that hits a crashed server is retried on another
+            return await self.pool.call_tool(tool_name, arguments)
+        
+        if self.result_cache is None:
+            return await send()
+        return await self.result_cache.get_or_call(tool_name, arguments, send, lambda result: result.isError)
+    
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Call a specific MCP tool"""
+        result = await self._call(tool_name, arguments)
+        return result_text(result)
+    
+    async def call_many(self, calls: Sequence[Tuple[str, Dict[str, Any]]],
+                        max_in_flight: int = 16,
+                        timeout: Optional[float] = CALL_TIMEOUT) -> List[ToolCallResult]:
+        """Call many tools concurrently, keeping up to max_in_flight requests outstanding.
+
+        Results come back in the order of calls. A failing call (an exception,
+        an isError result, or no answer within timeout seconds) is reported
+        in its own result instead of failing the batch.
+        """
+        semaphore = asyncio.Semaphore(max_in_flight)
+        
+        async def run(tool_name: str, arguments: Dict[str, Any]) -> ToolCallResult:
+            async with semaphore:
+                try:
+                    result = await asyncio.wait_for(self._call(tool_name, arguments), timeout)
+                except asyncio.TimeoutError:
+                    return ToolCallResult(tool_name, arguments, None, f"Timed out after {timeout}s")
+                except Exception as e:
+                    return ToolCallResult(tool_name, arguments, None, str(e) or type(e).__name__)
+            text = result_text(result)
+            if result.isError:
+                return ToolCallResult(tool_name, arguments, None, text)
+            return ToolCallResult(tool_name, arguments, text, None)
+        
+        return list(await asyncio.gather(*(run(tool_name, arguments) for tool_name, arguments in calls)))
     
     async def search_documents(self, query: str, limit: int = 10) -> str:
         """Search documents using MCP tool"""
@@ -83,14 +146,35 @@ class MinimalMCPClient:
         weather_result2 = await self.get_weather("Tokyo")
         print(f"Tokyo weather: {weather_result2}")
         
+        # Fan out several calls at once
+        print("\n4. Testing concurrent calls...")
+        results = await self.call_many([
+            ("search_documents", {"query": "neural networks", "limit": 1}),
+            ("get_weather", {"location": "London"}),
+            ("search_documents", {"query": "cloud storage", "limit": 1}),
+            ("get_weather", {"city": "Paris"}),
+        ])
+        for result in results:
+            outcome = result.text.splitlines()[0] if result.ok else f"error: {result.error}"
+            print(f"  {result.tool}({result.arguments}) -> {outcome}")
+        
+        if self.result_cache is not None:
+            print("\n5. Repeating a call (served from the client cache)...")
+            print(f"Tokyo weather: {await self.get_weather('Tokyo')}")
+            stats = self.result_cache.stats()
+            print(f"Cache: {stats['hits']} hits, {stats['misses']} misses")
+        
         print("\n✓ All MCP tool calls completed successfully!")
 
 async def main():
     """Main demonstration function"""
     print("Starting MCP Client Demo...")
     
-    # Create client
-    client = MinimalMCPClient("python mcp_server.py")
+    # Create client; repeated identical tool calls are answered from cache
+    client = MinimalMCPClient(
+        "python mcp_server.py",
+        result_cache=ToolResultCache(maxsize=256, ttls={"get_weather": 300, "search_documents": 60}),
+    )
     
     try:
         # Connect to server
@@ -102,6 +186,8 @@ async def main():
     except Exception as e:
         print(f"Error: {e}")
         print("Make sure mcp_server.py is in the same directory and MCP is installed.")
+    finally:
+        await close_shared_pools()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,851 @@
+#!/usr/bin/env python3
+"""
+On-disk inverted index with BM25 ranking for the search_documents tool.
+
+An index directory holds immutable segments plus a manifest listing the live
+ones:
+  manifest.json         - {"generation", "next_segment", "segments": [...],
+                           "retired": {name: time merged away}}
+  segments/seg-NNNNNN/  - one segment per ingestion batch or merge
+
+Each segment directory contains:
+  meta.json      - corpus statistics (document count, total length)
+  terms.bin      - UTF-8 terms back to back, in sorted order
+  lexicon.bin    - uint64 (term offset, posting offset, document frequency)
+                   per term, in the same order
+  postings.bin   - uint32 (doc_id, term_frequency) pairs grouped by term
+  doclens.bin    - uint32 token count per doc_id
+  docs.jsonl     - stored documents, one JSON object per line
+  docoffs.bin    - uint64 byte offset of each document in docs.jsonl
+  embeddings.npy - float32 (num_docs, EMBED_DIM) unit vectors for semantic
+                   search (written when NumPy is installed)
+
+The binary files are memory-mapped, so only the lexicon entries and posting
+lists touched by a query are paged in. New segments are published by atomically replacing the
+manifest, and readers pick them up on their next query. A background merger
+folds segments of similar size together (a tiered policy), so the segment
+count stays logarithmic in the corpus size without rewriting large segments
+over and over.
+
+Build an index with:
+  python search_index.py build data/documents.jsonl .mcp_index
+and add documents to it with ingest.py.
+"""
+import base64
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from cancellation import check_cancelled
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on a single writer per index
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BASE_DIR, "data", "documents.jsonl")
+DEFAULT_INDEX_DIR = os.path.join(BASE_DIR, ".mcp_index")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Semantic embedding parameters
+EMBED_DIM = 256
+EMBED_CHUNK_ROWS = 65536
+
+# Postings scored between cancellation checks
+CANCEL_CHECK_POSTINGS = 65536
+
+# Result pagination: hits per page at most, and hits per content chunk
+MAX_PAGE_SIZE = 100
+CHUNK_SIZE = 25
+
+# Tiered segment merge policy: segments below MERGE_FLOOR_DOCS share tier 0,
+# and each tier above holds segments MERGE_FACTOR times larger than the one
+# below. MERGE_FACTOR segments of one tier are merged into one segment of the
+# next, so each document is rewritten about once per tier, and segments are
+# never merged past MAX_MERGED_DOCS.
+MERGE_FACTOR = 4
+MERGE_FLOOR_DOCS = 1000
+MAX_MERGED_DOCS = 2_000_000
+MERGE_INTERVAL = 10.0
+# Seconds a merged-away segment stays on disk for searches that still use it
+RETIRE_GRACE = 60.0
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or such that "
+    "the their they this to was were which while with without".split()
+)
+
+# (document, term counts, token count, embedding or None)
+AnalyzedDoc = Tuple[Dict[str, Any], Dict[str, int], int, Any]
+# (segment position in the engine snapshot, doc_id within the segment)
+DocRef = Tuple[int, int]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into index terms"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield documents from a JSONL file"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _feature_bucket(feature: str) -> Tuple[int, float]:
+    """Hash a feature to a stable (dimension, sign) pair"""
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % EMBED_DIM, (1.0 if (digest >> 63) else -1.0)
+
+
+def embed(text: str):
+    """Embed text as a unit float32 vector with signed feature hashing.
+
+    Words and their character trigrams are both hashed, so related word forms
+    ("learn", "learning", "learned") and misspellings land close together.
+    """
+    if np is None:
+        raise RuntimeError("Semantic search requires NumPy. Install with: pip install numpy")
+    vector = np.zeros(EMBED_DIM, dtype=np.float32)
+    for word, count in Counter(tokenize(text)).items():
+        weight = 1.0 + math.log(count)
+        dim, sign = _feature_bucket(word)
+        vector[dim] += sign * weight
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            dim, sign = _feature_bucket(padded[i:i + 3])
+            vector[dim] += sign * weight * 0.5
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def analyze_document(doc: Dict[str, Any]) -> AnalyzedDoc:
+    """Tokenize and embed one document; safe to run in a worker process"""
+    text = f"{doc.get('title', '')} {doc.get('text', '')}"
+    terms = tokenize(text)
+    vector = embed(text) if np is not None else None
+    return doc, dict(Counter(terms)), len(terms), vector
+
+
+def _map_array(path: str, typecode: str):
+    """Memory-map a binary file as a read-only typed view"""
+    if os.path.getsize(path) == 0:
+        return None, memoryview(array(typecode))
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, memoryview(mm).cast(typecode)
+
+
+def _write_json_atomic(path: str, data: Any) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _write_segment_files(seg_dir: str, lexicon: Dict[str, List[int]], postings: array,
+                         doclens: array, docoffs: array, vectors: Optional[List[Any]]) -> int:
+    with open(os.path.join(seg_dir, "postings.bin"), "wb") as f:
+        postings.tofile(f)
+    with open(os.path.join(seg_dir, "doclens.bin"), "wb") as f:
+        doclens.tofile(f)
+    with open(os.path.join(seg_dir, "docoffs.bin"), "wb") as f:
+        docoffs.tofile(f)
+    entries = array("Q")
+    with open(os.path.join(seg_dir, "terms.bin"), "wb") as f:
+        for term in sorted(lexicon):
+            entries.append(f.tell())
+            entries.extend(lexicon[term])
+            f.write(term.encode("utf-8"))
+    with open(os.path.join(seg_dir, "lexicon.bin"), "wb") as f:
+        entries.tofile(f)
+    if vectors is not None and np is not None:
+        # Stream rows (single vectors or whole blocks) into the on-disk matrix
+        blocks = [np.atleast_2d(v) for v in vectors]
+        rows = sum(block.shape[0] for block in blocks)
+        matrix = np.lib.format.open_memmap(os.path.join(seg_dir, "embeddings.npy"), mode="w+",
+                                           dtype=np.float32, shape=(rows, EMBED_DIM))
+        row = 0
+        for block in blocks:
+            matrix[row:row + block.shape[0]] = block
+            row += block.shape[0]
+        matrix.flush()
+        del matrix
+
+    num_docs = len(doclens)
+    meta = {"num_docs": num_docs, "total_doclen": sum(doclens)}
+    # meta.json is written last and marks the segment as complete
+    with open(os.path.join(seg_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return num_docs
+
+
+def write_segment(analyzed: Iterable[AnalyzedDoc], seg_dir: str) -> int:
+    """Write one segment directory from analyzed documents"""
+    os.makedirs(seg_dir, exist_ok=True)
+    inverted: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+    doclens = array("I")
+    docoffs = array("Q")
+    vectors: Optional[List[Any]] = []
+
+    with open(os.path.join(seg_dir, "docs.jsonl"), "wb") as docs_file:
+        for doc_id, (doc, term_counts, length, vector) in enumerate(analyzed):
+            for term, tf in term_counts.items():
+                inverted[term].append((doc_id, tf))
+            doclens.append(length)
+            docoffs.append(docs_file.tell())
+            docs_file.write(json.dumps(doc, ensure_ascii=False).encode("utf-8") + b"\n")
+            if vector is None:
+                vectors = None
+            elif vectors is not None:
+                vectors.append(vector)
+
+    lexicon: Dict[str, List[int]] = {}
+    postings = array("I")
+    for term in sorted(inverted):
+        lexicon[term] = [len(postings) // 2, len(inverted[term])]
+        for doc_id, tf in inverted[term]:
+            postings.append(doc_id)
+            postings.append(tf)
+
+    return _write_segment_files(seg_dir, lexicon, postings, doclens, docoffs, vectors)
+
+
+def build_embeddings(seg_dir: str) -> None:
+    """Write embeddings.npy for the documents stored in a segment directory"""
+    if np is None:
+        raise RuntimeError("Semantic search requires NumPy. Install with: pip install numpy")
+    with open(os.path.join(seg_dir, "meta.json"), encoding="utf-8") as f:
+        num_docs = json.load(f)["num_docs"]
+
+    tmp_path = os.path.join(seg_dir, f"embeddings.{uuid.uuid4().hex}.tmp.npy")
+    matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(num_docs, EMBED_DIM))
+    for doc_id, doc in enumerate(read_jsonl(os.path.join(seg_dir, "docs.jsonl"))):
+        matrix[doc_id] = embed(f"{doc.get('title', '')} {doc.get('text', '')}")
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, os.path.join(seg_dir, "embeddings.npy"))
+
+
+def _top_k_similar(matrix, query_vector, limit: int) -> Tuple[int, List[Tuple[int, float]]]:
+    """Chunked cosine top-k over unit row vectors"""
+    num_docs = matrix.shape[0]
+    if limit <= 0 or num_docs == 0 or not query_vector.any():
+        return 0, []
+
+    # Score the matrix in row chunks, keeping only each chunk's top-k
+    total = 0
+    cand_ids = []
+    cand_scores = []
+    for start in range(0, num_docs, EMBED_CHUNK_ROWS):
+        check_cancelled()
+        sims = matrix[start:start + EMBED_CHUNK_ROWS] @ query_vector
+        total += int(np.count_nonzero(sims > 0))
+        if len(sims) > limit:
+            keep = np.argpartition(sims, -limit)[-limit:]
+        else:
+            keep = np.arange(len(sims))
+        cand_ids.append(keep + start)
+        cand_scores.append(sims[keep])
+
+    ids = np.concatenate(cand_ids)
+    scores = np.concatenate(cand_scores)
+    if len(scores) > limit:
+        keep = np.argpartition(scores, -limit)[-limit:]
+        ids, scores = ids[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+    hits = [(int(ids[i]), float(scores[i])) for i in order if scores[i] > 0]
+    return total, hits
+
+
+class Lexicon:
+    """Sorted term -> (posting offset, document frequency) map over memory-mapped arrays.
+
+    A lookup is a binary search over terms.bin and lexicon.bin, so only the
+    probed entries are paged in. Iteration yields the terms in sorted order.
+    """
+
+    def __init__(self, terms, entries):
+        self.terms = terms
+        self.entries = entries
+        self.size = len(entries) // 3
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _term(self, i: int) -> bytes:
+        start = self.entries[3 * i]
+        end = self.entries[3 * i + 3] if i + 1 < self.size else len(self.terms)
+        return bytes(self.terms[start:end])
+
+    def get(self, term: str) -> Optional[Tuple[int, int]]:
+        key = term.encode("utf-8")
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and self._term(lo) == key:
+            return self.entries[3 * lo + 1], self.entries[3 * lo + 2]
+        return None
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.size):
+            yield self._term(i).decode("utf-8")
+
+
+class InvertedIndex:
+    """Read-only view over one segment directory written by write_segment"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.num_docs: int = meta["num_docs"]
+        self.total_doclen: int = meta["total_doclen"]
+
+        self._maps = []
+        self.lexicon = Lexicon(self._open("terms.bin", "B"), self._open("lexicon.bin", "Q"))
+        self.postings = self._open("postings.bin", "I")
+        self.doclens = self._open("doclens.bin", "I")
+        self.docoffs = self._open("docoffs.bin", "Q")
+        self.docs = self._open("docs.jsonl", "B")
+        self._embeddings = None
+
+    def _open(self, name: str, typecode: str):
+        mm, view = _map_array(os.path.join(self.index_dir, name), typecode)
+        if mm is not None:
+            self._maps.append((mm, view))
+        return view
+
+    @property
+    def embeddings(self):
+        """The segment's embedding matrix, memory-mapped on first use"""
+        if self._embeddings is None:
+            if np is None:
+                raise RuntimeError("Semantic search requires NumPy. Install with: pip install numpy")
+            path = os.path.join(self.index_dir, "embeddings.npy")
+            if not os.path.exists(path):
+                build_embeddings(self.index_dir)
+            self._embeddings = np.load(path, mmap_mode="r")
+        return self._embeddings
+
+    def close(self):
+        """Release the memory maps"""
+        for mm, view in self._maps:
+            view.release()
+            mm.close()
+        self._maps.clear()
+        self._embeddings = None
+
+    def document_frequency(self, term: str) -> int:
+        entry = self.lexicon.get(term)
+        return entry[1] if entry else 0
+
+    def score(self, terms: Dict[str, float], avg_doclen: float, limit: int) -> Tuple[int, List[Tuple[int, float]]]:
+        """Return (documents matching terms, top-limit (doc_id, BM25 score) pairs) for term -> idf.
+
+        Ties are broken by doc_id so that pages of the same query line up.
+        """
+        if np is None:
+            return self._score_python(terms, avg_doclen, limit)
+        postings = np.frombuffer(self.postings, dtype=np.uint32)
+        doclens = np.frombuffer(self.doclens, dtype=np.uint32)
+        norm = K1 / (avg_doclen or 1.0)
+
+        # Score each posting list slice as arrays, then sum per document
+        id_parts = []
+        score_parts = []
+        for term, idf in terms.items():
+            entry = self.lexicon.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            for block in range(start, start + df, CANCEL_CHECK_POSTINGS):
+                check_cancelled()
+                stop = min(block + CANCEL_CHECK_POSTINGS, start + df)
+                pairs = postings[2 * block:2 * stop].reshape(-1, 2)
+                doc_ids = pairs[:, 0]
+                tf = pairs[:, 1].astype(np.float64)
+                denom = tf + K1 * (1 - B) + norm * B * doclens[doc_ids]
+                id_parts.append(doc_ids)
+                score_parts.append(idf * tf * (K1 + 1) / denom)
+        if not id_parts:
+            return 0, []
+        doc_ids, inverse = np.unique(np.concatenate(id_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        total = len(doc_ids)
+        if limit <= 0:
+            return total, []
+
+        keep = np.arange(total)
+        if total > limit:
+            # Everything scoring at least the k-th best, ties included
+            kth = np.partition(scores, total - limit)[total - limit]
+            keep = np.flatnonzero(scores >= kth)
+        order = keep[np.lexsort((doc_ids[keep], -scores[keep]))][:limit]
+        return total, [(int(doc_ids[i]), float(scores[i])) for i in order]
+
+    def _score_python(self, terms: Dict[str, float], avg_doclen: float,
+                      limit: int) -> Tuple[int, List[Tuple[int, float]]]:
+        scores: Dict[int, float] = defaultdict(float)
+        postings = self.postings
+        doclens = self.doclens
+        norm = K1 / (avg_doclen or 1.0)
+
+        for term, idf in terms.items():
+            entry = self.lexicon.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            end = 2 * (start + df)
+            for block in range(2 * start, end, 2 * CANCEL_CHECK_POSTINGS):
+                check_cancelled()
+                for i in range(block, min(block + 2 * CANCEL_CHECK_POSTINGS, end), 2):
+                    doc_id = postings[i]
+                    tf = postings[i + 1]
+                    denom = tf + K1 * (1 - B) + norm * B * doclens[doc_id]
+                    scores[doc_id] += idf * tf * (K1 + 1) / denom
+        top = heapq.nsmallest(max(limit, 0), scores.items(), key=lambda item: (-item[1], item[0]))
+        return len(scores), top
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        """Load a stored document by its segment-local id"""
+        start = self.docoffs[doc_id]
+        end = self.docoffs[doc_id + 1] if doc_id + 1 < self.num_docs else len(self.docs)
+        return json.loads(bytes(self.docs[start:end]))
+
+
+def _rebase_postings(block, base: int) -> bytes:
+    """(doc_id, tf) pairs from a posting slice with base added to every doc_id"""
+    if base == 0:
+        return bytes(block)
+    if np is not None:
+        pairs = np.frombuffer(block, dtype=np.uint32).reshape(-1, 2).copy()
+        pairs[:, 0] += np.uint32(base)
+        return pairs.tobytes()
+    rebased = array("I", block)
+    rebased[0::2] = array("I", [doc_id + base for doc_id in rebased[0::2]])
+    return rebased.tobytes()
+
+
+def merge_segment_dirs(src_dirs: List[str], dest_dir: str) -> int:
+    """Write one segment holding the documents of several segments"""
+    os.makedirs(dest_dir, exist_ok=True)
+    segments = [InvertedIndex(d) for d in src_dirs]
+    try:
+        doclens = array("I")
+        docoffs = array("Q")
+        bases = []
+        with open(os.path.join(dest_dir, "docs.jsonl"), "wb") as docs_file:
+            for seg in segments:
+                bases.append(len(doclens))
+                doclens.extend(seg.doclens)
+                offset = docs_file.tell()
+                docoffs.extend(offset + o for o in seg.docoffs)
+                docs_file.write(seg.docs)
+
+        # Concatenate each term's posting lists, rebasing segment-local doc ids
+        lexicon: Dict[str, List[int]] = {}
+        postings = array("I")
+        # Lexicons iterate in sorted order, so merge them without collecting every term
+        for term, _ in itertools.groupby(heapq.merge(*(seg.lexicon for seg in segments))):
+            start = len(postings) // 2
+            for seg, base in zip(segments, bases):
+                entry = seg.lexicon.get(term)
+                if entry is None:
+                    continue
+                seg_start, df = entry
+                postings.frombytes(_rebase_postings(seg.postings[2 * seg_start:2 * (seg_start + df)], base))
+            lexicon[term] = [start, len(postings) // 2 - start]
+
+        vectors = None
+        if np is not None:
+            vectors = [seg.embeddings for seg in segments]
+        return _write_segment_files(dest_dir, lexicon, postings, doclens, docoffs, vectors)
+    finally:
+        for seg in segments:
+            seg.close()
+
+
+@contextmanager
+def _locked(index_dir: str, name: str, blocking: bool = True):
+    """Hold an advisory file lock; yields False if a non-blocking lock is busy"""
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, name), "a+") as lock_file:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    """Return the index manifest, or None if the index does not exist yet"""
+    try:
+        with open(os.path.join(index_dir, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _segments_dir(index_dir: str) -> str:
+    return os.path.join(index_dir, "segments")
+
+
+def _staging_dir(index_dir: str) -> str:
+    return os.path.join(_segments_dir(index_dir), f".tmp-{uuid.uuid4().hex}")
+
+
+def _publish(index_dir: str, staging: str, replaces: Tuple[str, ...] = ()) -> str:
+    """Move a staged segment into place and swap it into the manifest"""
+    with _locked(index_dir, "manifest.lock"):
+        manifest = read_manifest(index_dir) or {"generation": 0, "next_segment": 1, "segments": []}
+        name = f"seg-{manifest['next_segment']:06d}"
+        os.rename(staging, os.path.join(_segments_dir(index_dir), name))
+        manifest["segments"] = [s for s in manifest["segments"] if s not in replaces] + [name]
+        retired = manifest.setdefault("retired", {})
+        retired.update((s, time.time()) for s in replaces)
+        manifest["next_segment"] += 1
+        manifest["generation"] += 1
+        _write_json_atomic(os.path.join(index_dir, "manifest.json"), manifest)
+    return name
+
+
+def add_segment(index_dir: str, analyzed: Iterable[AnalyzedDoc]) -> str:
+    """Write analyzed documents as a new immutable segment and publish it"""
+    staging = _staging_dir(index_dir)
+    try:
+        write_segment(analyzed, staging)
+        return _publish(index_dir, staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def build_index(documents: Iterable[Dict[str, Any]], index_dir: str) -> int:
+    """Index documents with 'id', 'title' and 'text' fields as a new segment"""
+    analyzed = [analyze_document(doc) for doc in documents]
+    add_segment(index_dir, analyzed)
+    return len(analyzed)
+
+
+def _merge_tier(num_docs: int, merge_factor: int, floor_docs: int) -> int:
+    tier, bound = 0, floor_docs
+    while num_docs >= bound:
+        tier += 1
+        bound *= merge_factor
+    return tier
+
+
+def select_merge(sizes: Dict[str, int], merge_factor: int = MERGE_FACTOR,
+                 floor_docs: int = MERGE_FLOOR_DOCS, max_docs: int = MAX_MERGED_DOCS) -> Optional[List[str]]:
+    """Pick merge_factor segments of the same size tier to merge, smallest tier first.
+
+    sizes maps segment names to document counts. Returns None when no tier
+    has enough segments whose merged size stays within max_docs.
+    """
+    tiers: Dict[int, List[str]] = defaultdict(list)
+    for name, num_docs in sizes.items():
+        if num_docs < max_docs:
+            tiers[_merge_tier(num_docs, merge_factor, floor_docs)].append(name)
+    for tier in sorted(tiers):
+        if len(tiers[tier]) < merge_factor:
+            continue
+        victims = sorted(tiers[tier], key=lambda n: sizes[n])[:merge_factor]
+        if sum(sizes[n] for n in victims) <= max_docs:
+            return victims
+    return None
+
+
+def merge_segments(index_dir: str, merge_factor: int = MERGE_FACTOR,
+                   floor_docs: int = MERGE_FLOOR_DOCS, max_docs: int = MAX_MERGED_DOCS) -> Optional[str]:
+    """Merge merge_factor similar-size segments, if some tier has that many (see select_merge).
+
+    Returns the new segment name, or None if nothing was merged. Only one
+    merger runs per index at a time; concurrent calls return None.
+    """
+    with _locked(index_dir, "merge.lock", blocking=False) as acquired:
+        if not acquired:
+            return None
+        manifest = read_manifest(index_dir)
+        if manifest is None or len(manifest["segments"]) < merge_factor:
+            return None
+
+        seg_root = _segments_dir(index_dir)
+        sizes = {}
+        for name in manifest["segments"]:
+            with open(os.path.join(seg_root, name, "meta.json"), encoding="utf-8") as f:
+                sizes[name] = json.load(f)["num_docs"]
+        victims = select_merge(sizes, merge_factor, floor_docs, max_docs)
+        if victims is None:
+            return None
+
+        staging = _staging_dir(index_dir)
+        try:
+            merge_segment_dirs([os.path.join(seg_root, n) for n in victims], staging)
+            name = _publish(index_dir, staging, replaces=tuple(victims))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        # The victims stay on disk until sweep_retired: other processes may
+        # have read the old manifest and not opened them yet
+        return name
+
+
+def sweep_retired(index_dir: str, grace: float = RETIRE_GRACE) -> List[str]:
+    """Delete segments merged away more than grace seconds ago; return their names.
+
+    By then every search has moved on to a newer manifest generation, since
+    readers re-read the manifest on each query.
+    """
+    with _locked(index_dir, "manifest.lock"):
+        manifest = read_manifest(index_dir)
+        retired = manifest.get("retired", {}) if manifest else {}
+        now = time.time()
+        expired = [name for name, when in retired.items() if now - when >= grace]
+        if not expired:
+            return []
+        for name in expired:
+            shutil.rmtree(os.path.join(_segments_dir(index_dir), name), ignore_errors=True)
+            del retired[name]
+        # The live segment list is unchanged, so the generation is too
+        _write_json_atomic(os.path.join(index_dir, "manifest.json"), manifest)
+    return expired
+
+
+def start_background_merger(index_dir: Optional[str] = None,
+                            interval: float = MERGE_INTERVAL) -> threading.Thread:
+    """Start a daemon thread that periodically merges segments and sweeps retired ones"""
+    index_dir = index_dir or get_engine().index_dir
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                while merge_segments(index_dir):
+                    pass
+                sweep_retired(index_dir)
+            except Exception as e:
+                print(f"Segment merge failed: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=run, name="segment-merger", daemon=True)
+    thread.start()
+    return thread
+
+
+class SearchEngine:
+    """Searches all live segments of an index, following manifest updates"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._generation = None
+        self._open_segments: Dict[str, InvertedIndex] = {}
+        self.segments: List[InvertedIndex] = []
+        self.refresh()
+
+    def refresh(self) -> List[InvertedIndex]:
+        """Reopen the segment list if the manifest changed; return the snapshot"""
+        manifest = read_manifest(self.index_dir) or {"generation": 0, "segments": []}
+        if manifest["generation"] == self._generation:
+            return self.segments
+        with self._lock:
+            if manifest["generation"] != self._generation:
+                seg_root = _segments_dir(self.index_dir)
+                opened = {}
+                for name in manifest["segments"]:
+                    seg = self._open_segments.get(name)
+                    opened[name] = seg or InvertedIndex(os.path.join(seg_root, name))
+                # Dropped segments are released once no search snapshot uses them
+                self._open_segments = opened
+                self.segments = list(opened.values())
+                self._generation = manifest["generation"]
+        return self.segments
+
+    @property
+    def num_docs(self) -> int:
+        return sum(seg.num_docs for seg in self.refresh())
+
+    def search(self, query: str, limit: int = 10) -> Tuple[int, List[Tuple[DocRef, float]], List[InvertedIndex]]:
+        """Return (total matches, top-limit ((segment, doc_id), score) pairs, segment snapshot)"""
+        segments = self.refresh()
+        num_docs = sum(seg.num_docs for seg in segments)
+        avg_doclen = sum(seg.total_doclen for seg in segments) / num_docs if num_docs else 1.0
+
+        # Corpus-wide statistics keep scores comparable across segments
+        terms = {}
+        for term in set(tokenize(query)):
+            df = sum(seg.document_frequency(term) for seg in segments)
+            if df:
+                terms[term] = math.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+
+        total = 0
+        candidates: List[Tuple[DocRef, float]] = []
+        for pos, seg in enumerate(segments):
+            check_cancelled()
+            seg_total, top = seg.score(terms, avg_doclen, limit)
+            total += seg_total
+            candidates.extend(((pos, doc_id), score) for doc_id, score in top)
+        return total, heapq.nlargest(max(limit, 0), candidates, key=lambda item: item[1]), segments
+
+    def semantic_search(self, query: str, limit: int = 10) -> Tuple[int, List[Tuple[DocRef, float]], List[InvertedIndex]]:
+        """Return (documents with positive similarity, top-limit hits, segment snapshot)"""
+        segments = self.refresh()
+        query_vector = embed(query)
+        total = 0
+        candidates: List[Tuple[DocRef, float]] = []
+        for pos, seg in enumerate(segments):
+            seg_total, hits = _top_k_similar(seg.embeddings, query_vector, limit)
+            total += seg_total
+            candidates.extend(((pos, doc_id), score) for doc_id, score in hits)
+        return total, heapq.nlargest(max(limit, 0), candidates, key=lambda item: item[1]), segments
+
+
+_engine: Optional[SearchEngine] = None
+
+
+def get_engine(index_dir: Optional[str] = None, corpus: Optional[str] = None) -> SearchEngine:
+    """Open the shared index, building it from the corpus on first use"""
+    global _engine
+    if _engine is None:
+        index_dir = index_dir or os.environ.get("MCP_INDEX_DIR", DEFAULT_INDEX_DIR)
+        corpus = corpus or os.environ.get("MCP_CORPUS", DEFAULT_CORPUS)
+        with _locked(index_dir, "bootstrap.lock"):
+            if read_manifest(index_dir) is None:
+                build_index(read_jsonl(corpus), index_dir)
+        _engine = SearchEngine(index_dir)
+    return _engine
+
+
+def warm_up() -> None:
+    """Open the shared index ahead of the first query (process pool initializer)"""
+    get_engine()
+
+
+def encode_cursor(query: str, mode: str, offset: int) -> str:
+    """Build the opaque cursor for the page starting at offset"""
+    payload = json.dumps({"q": query, "m": mode, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, query: str, mode: str) -> int:
+    """Return the offset stored in a cursor issued for the same query and mode"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset = int(payload["o"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if payload.get("q") != query or payload.get("m") != mode or offset < 0:
+        raise ValueError("Cursor was issued for a different query")
+    return offset
+
+
+class ResultPage(NamedTuple):
+    query: str
+    total: int
+    offset: int
+    lines: List[str]
+    next_cursor: Optional[str]
+
+    def header(self) -> str:
+        if not self.lines:
+            return f"Found {self.total} documents matching '{self.query}' (showing 0)"
+        first, last = self.offset + 1, self.offset + len(self.lines)
+        if self.offset == 0 and self.next_cursor is None:
+            return f"Found {self.total} documents matching '{self.query}' (showing {len(self.lines)})"
+        return f"Found {self.total} documents matching '{self.query}' (showing {first}-{last})"
+
+    def chunks(self, chunk_size: int = CHUNK_SIZE) -> List[str]:
+        """Split the page into text chunks of at most chunk_size hits each"""
+        groups = [self.lines[i:i + chunk_size] for i in range(0, len(self.lines), chunk_size)] or [[]]
+        groups[0] = [self.header()] + groups[0]
+        if self.next_cursor:
+            groups[-1] = groups[-1] + [f"Next cursor: {self.next_cursor}"]
+        return ["\n".join(group) for group in groups]
+
+
+def search_page(query: str, limit: int = 10, mode: str = "keyword", cursor: Optional[str] = None) -> ResultPage:
+    """Run a search and return one page of formatted hits.
+
+    limit is capped at MAX_PAGE_SIZE; pass the returned next_cursor back to
+    fetch the following page.
+    """
+    limit = max(0, min(limit, MAX_PAGE_SIZE))
+    offset = decode_cursor(cursor, query, mode) if cursor else 0
+    engine = get_engine()
+    if mode == "semantic":
+        total, hits, segments = engine.semantic_search(query, offset + limit)
+    elif mode == "keyword":
+        total, hits, segments = engine.search(query, offset + limit)
+    else:
+        raise ValueError(f"Unknown search mode: {mode}")
+
+    lines = []
+    for rank, ((pos, doc_id), score) in enumerate(hits[offset:], offset + 1):
+        doc = segments[pos].document(doc_id)
+        lines.append(f"{rank}. [{doc.get('id', doc_id)}] {doc.get('title', '')} (score {score:.2f})")
+    end = offset + len(lines)
+    next_cursor = encode_cursor(query, mode, end) if lines and end < total else None
+    return ResultPage(query, total, offset, lines, next_cursor)
+
+
+def search_documents(query: str, limit: int = 10, mode: str = "keyword", cursor: Optional[str] = None) -> str:
+    """Run a keyword or semantic search and format one page of hits as tool output text"""
+    return "\n".join(search_page(query, limit, mode, cursor).chunks(MAX_PAGE_SIZE))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        count = build_index(read_jsonl(sys.argv[2]), sys.argv[3])
+        print(f"Indexed {count} documents into {sys.argv[3]}")
+    elif len(sys.argv) == 2 and sys.argv[1] == "merge":
+        while merge_segments(get_engine().index_dir, merge_factor=2):
+            pass
+        sweep_retired(get_engine().index_dir)
+        print(f"Index has {len(get_engine().refresh())} segment(s)")
+    elif len(sys.argv) >= 3 and sys.argv[1] in ("search", "semantic"):
+        mode = "keyword" if sys.argv[1] == "search" else "semantic"
+        print(search_documents(" ".join(sys.argv[2:]), mode=mode))
+    else:
+        print("Usage: python search_index.py build <corpus.jsonl> <index_dir>")
+        print("       python search_index.py merge")
+        print("       python search_index.py search <query>")
+        print("       python search_index.py semantic <query>")
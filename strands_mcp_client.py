@@ -1,4 +1,5 @@
 import asyncio
+import time
 try:
     from mcp import stdio_client, StdioServerParameters
     from strands import Agent
@@ -10,10 +11,14 @@ except ImportError as e:
     exit(1)
 
 class StrandsMCPClient:
-    def __init__(self, server_command: list[str]):
+    def __init__(self, server_command: list[str], persistent: bool = False):
         self.server_command = server_command
+        # Persistent mode keeps one server session, tool list and Agent across chat turns
+        self.persistent = persistent
         self.mcp_client = None
         self.agent = None
+        self.tools = None
+        self._open = False
     
     async def connect(self):
         """Connect to MCP server using official Strands MCP integration"""
@@ -26,12 +31,43 @@ class StrandsMCPClient:
         ))
         
         print("Strands MCP client initialized")
+        if self.persistent:
+            self.start()
+    
+    def start(self):
+        """Open the MCP client context and build the Agent once for all turns"""
+        if self._open:
+            return
+        self.mcp_client.__enter__()
+        self._open = True
+        try:
+            self.tools = self.mcp_client.list_tools_sync()
+            self.agent = Agent(tools=self.tools)
+        except Exception:
+            self.close_sync()
+            raise
+    
+    def close_sync(self):
+        if self._open:
+            self._open = False
+            self.agent = None
+            self.tools = None
+            self.mcp_client.__exit__(None, None, None)
+    
+    async def close(self):
+        """Stop the server session opened by persistent mode"""
+        self.close_sync()
     
     async def chat(self, message: str) -> str:
         """Chat with agent using MCP tools - Manual Context Management"""
         if not self.mcp_client:
             raise RuntimeError("Client not connected. Call connect() first.")
         
+        # Persistent mode - session, tools and Agent (with its conversation) are reused
+        if self._open:
+            response = self.agent(message)
+            return response.message['content'][0]['text']
+        
         # Manual approach - explicit context management
         with self.mcp_client:
             tools = self.mcp_client.list_tools_sync()
@@ -70,6 +106,20 @@ async def main():
     except Exception as e:
         print(f"Managed approach failed: {e}")
     
+    # Persistent mode: the server is spawned and tools listed once, not per turn
+    persistent = StrandsMCPClient(["python", "mcp_server.py"], persistent=True)
+    try:
+        await persistent.connect()
+        print(f"Persistent session tools: {[tool.tool_name for tool in persistent.tools]}")
+        for message in ["Get weather for Tokyo", "Now search for AI research documents"]:
+            start = time.perf_counter()
+            response = await persistent.chat(message)
+            print(f"Persistent turn ({time.perf_counter() - start:.2f}s): {response}")
+    except Exception as e:
+        print(f"Persistent approach failed: {e}")
+    finally:
+        await persistent.close()
+    
     print("✓ Strands MCP integration working!")
 
 if __name__ == "__main__":
@@ -50,6 +50,10 @@ async def test_client(client_file: str, client_name: str):
     except ImportError as e:
         print(f"⚠ {client_name} import failed (missing dependencies): {e}")
         return False
+    except SystemExit:
+        # Clients exit on import when an optional framework is not installed
+        print(f"⚠ {client_name} import failed (missing dependencies)")
+        return False
     except Exception as e:
         print(f"✗ {client_name} error: {e}")
         return False
@@ -69,7 +73,9 @@ async def main():
         ("strands_mcp_client.py", "Strands Client"),
         ("crewai_mcp_client.py", "CrewAI Client"),
         ("langchain_mcp_client.py", "LangChain Client"),
-        ("langgraph_mcp_client.py", "LangGraph Client")
+        ("langgraph_mcp_client.py", "LangGraph Client"),
+        ("minimal_mcp_client.py", "Minimal Client"),
+        ("bedrock_mcp_client.py", "Bedrock Client")
     ]
     
     results = []
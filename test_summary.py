@@ -49,6 +49,8 @@ def main():
         ("CrewAI Framework", "crewai_mcp_client.py", "CrewAI team-based agents"),
         ("LlamaIndex Framework", "llamaindex_mcp_client.py", "LlamaIndex RAG framework"),
         ("LangGraph Framework", "langgraph_mcp_client.py", "LangGraph workflow graphs"),
+        ("Minimal MCP Client", "minimal_mcp_client.py", "Pooled sessions, call_many and result cache"),
+        ("Component Tests", "test_components.py", "Router, search index, caches, gazetteer, schemas, admission"),
     ]
     
     results = []
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+On-disk catalog of MCP server tool schemas.
+
+Clients normally call list_tools() on every connect before they can route a
+single call. The catalog stores each server's tool list in a JSON file keyed
+by the server's identity (its launch command and working directory) together
+with the name and version it reports from initialize. The servers here
+report schema_version(), a hash of their tool list, so the version changes
+whenever a schema does. On the next connect a client whose server still
+reports the same version starts from the cached schemas and refreshes them
+in the background. A tools/list_changed
+notification from the server triggers a refresh as well.
+
+Files live in MCP_TOOL_CATALOG_DIR (default: .mcp_catalog next to this file).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.types import InitializeResult, ServerNotification, Tool, ToolListChangedNotification
+
+DEFAULT_CATALOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".mcp_catalog")
+# Cached tool lists younger than this are used without a background refresh
+REFRESH_AFTER = 300.0
+
+
+class CatalogEntry(NamedTuple):
+    server_name: str
+    server_version: str
+    fetched_at: float
+    tools: List[Tool]
+
+
+def server_identity(params: StdioServerParameters) -> str:
+    """Stable identity for a stdio server: command line plus working directory"""
+    cwd = os.path.abspath(str(params.cwd) if params.cwd else os.getcwd())
+    return json.dumps([params.command, *params.args, cwd])
+
+
+def schema_version(tools: List[Tool]) -> str:
+    """Version string for a server: a short hash of its list_tools payload.
+
+    Servers pass this to their constructor so the version they report from
+    initialize changes whenever a tool schema does.
+    """
+    payload = json.dumps(
+        [tool.model_dump(mode="json", by_alias=True, exclude_none=True) for tool in tools], sort_keys=True
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class ToolCatalog:
+    """Directory of per-server tool lists"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.environ.get("MCP_TOOL_CATALOG_DIR", DEFAULT_CATALOG_DIR)
+
+    def _path(self, identity: str) -> str:
+        digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def load(self, identity: str) -> Optional[CatalogEntry]:
+        try:
+            with open(self._path(identity), encoding="utf-8") as f:
+                data = json.load(f)
+            if data["identity"] != identity:
+                return None
+            return CatalogEntry(
+                data["server"]["name"],
+                data["server"]["version"],
+                data["fetched_at"],
+                [Tool.model_validate(tool) for tool in data["tools"]],
+            )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # A corrupt entry only costs a list_tools call
+            print(f"Ignoring unreadable tool catalog entry: {e}", file=sys.stderr)
+            return None
+
+    def save(self, identity: str, server_name: str, server_version: str, tools: List[Tool]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(identity)
+        data = {
+            "identity": identity,
+            "server": {"name": server_name, "version": server_version},
+            "fetched_at": time.time(),
+            "tools": [tool.model_dump(mode="json", by_alias=True, exclude_none=True) for tool in tools],
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+class CatalogTracker:
+    """Keeps one client session's tool list in sync with the catalog.
+
+    Pass tracker.message_handler to ClientSession so tools/list_changed
+    notifications are seen, call attach() after initialize(), and close the
+    tracker (or use it as an async context manager inside the session's)
+    before the session ends.
+    """
+
+    def __init__(self, identity: str, catalog: Optional[ToolCatalog] = None,
+                 refresh_after: float = REFRESH_AFTER,
+                 on_change: Optional[Callable[[List[Tool]], Any]] = None):
+        self.identity = identity
+        self.catalog = catalog
+        self.refresh_after = refresh_after
+        self.on_change = on_change
+        self.tools: List[Tool] = []
+        self.from_cache = False
+        self._session: Optional[ClientSession] = None
+        self._server = ("", "")
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "CatalogTracker":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @property
+    def tool_names(self) -> List[str]:
+        return [tool.name for tool in self.tools]
+
+    async def attach(self, session: ClientSession, init: InitializeResult) -> List[Tool]:
+        """Return the server's tools, from the catalog when it matches the server version"""
+        self._session = session
+        self._server = (init.serverInfo.name, init.serverInfo.version)
+        entry = self.catalog.load(self.identity) if self.catalog else None
+        if entry is None or (entry.server_name, entry.server_version) != self._server:
+            await self.refresh()
+            return self.tools
+
+        self.tools = entry.tools
+        self.from_cache = True
+        if time.time() - entry.fetched_at >= self.refresh_after:
+            self.schedule_refresh()
+        return self.tools
+
+    async def refresh(self) -> List[Tool]:
+        """Fetch the tool list from the server and store it in the catalog"""
+        tools = (await self._session.list_tools()).tools
+        changed = self.tools != tools
+        self.tools = tools
+        self.from_cache = False
+        if self.catalog:
+            self.catalog.save(self.identity, *self._server, tools)
+        if changed and self.on_change:
+            self.on_change(tools)
+        return tools
+
+    def schedule_refresh(self) -> None:
+        """Refresh in the background; at most one refresh runs at a time"""
+        if self._session is None or (self._refresh_task and not self._refresh_task.done()):
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"Tool catalog refresh failed: {e}", file=sys.stderr)
+
+    async def message_handler(self, message) -> None:
+        if isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            self.schedule_refresh()
+
+    async def close(self) -> None:
+        """Stop a pending background refresh; call before the session closes"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+        self._refresh_task = None
+        self._session = None
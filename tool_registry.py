@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Table-driven tool registry for the low-level MCP server.
+
+Each tool is declared once with its schema, handler and execution policy.
+Dispatch is a dict lookup, the tools/list payload is built once, and every
+inputSchema is compiled into a validator when the tool is registered, so bad
+arguments are rejected before the handler runs.
+
+Execution policies:
+  inline  - async handler awaited on the event loop (I/O-bound tools)
+  thread  - sync handler run in a shared thread pool
+  process - sync handler run in a process pool (CPU-bound tools); the
+            handler must be a picklable module-level function
+Thread and process work is admitted through a bounded queue per pool, so a
+burst of heavy calls waits on the event loop instead of piling up inside the
+pool, and light inline tools keep their latency.
+
+Thread and process handlers are passed a cancellation token (see
+cancellation.py) that trips when the MCP request is cancelled or its deadline
+passes; long-running handlers poll it with check_cancelled().
+
+A tool may also set a concurrency limit. Its calls then pass through an
+admission queue ordered by priority (see admission.py), and calls arriving
+when that queue is full fail fast with a retryable Overloaded error. Limits
+can be overridden with MCP_TOOL_LIMITS="search_documents=4:16,...".
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from mcp.types import TextContent, Tool
+
+from admission import Admission, ToolLimiter, parse_limits, priority_rank
+from cancellation import CancelToken, DeadlineExceeded, SlotToken, init_worker, run_with_token
+
+Handler = Union[
+    Callable[[Dict[str, Any]], Awaitable[List[TextContent]]],
+    Callable[[Dict[str, Any]], List[TextContent]],
+]
+Validator = Callable[[Any], Any]
+
+EXECUTION_POLICIES = ("inline", "thread", "process")
+THREAD_WORKERS = int(os.environ.get("MCP_THREAD_WORKERS", "4"))
+# Server processes on this host, each with its own process pool (set by
+# mcp_server.py --workers); by default they split the CPUs between them
+HTTP_WORKERS = max(1, int(os.environ.get("MCP_HTTP_WORKERS", "1")))
+PROCESS_WORKERS = int(os.environ.get("MCP_PROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) // HTTP_WORKERS))))
+# Calls allowed to wait inside each pool beyond one per worker
+POOL_QUEUE_DEPTH = int(os.environ.get("MCP_POOL_QUEUE_DEPTH", "4"))
+# Waiting calls allowed per limited tool before new calls are rejected
+DEFAULT_MAX_QUEUE = 32
+
+
+class SchemaError(ValueError):
+    """Arguments do not match a tool's inputSchema"""
+
+
+SUPPORTED_KEYWORDS = frozenset({
+    "type", "properties", "required", "additionalProperties", "items", "enum", "default",
+    "minimum", "maximum", "minLength", "maxLength", "minItems", "maxItems", "description", "title",
+})
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+    or (isinstance(v, float) and v.is_integer()),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _describe(value: Any) -> str:
+    return repr(value) if not isinstance(value, str) else f"'{value}'"
+
+
+def compile_schema(schema: Dict[str, Any], path: str = "") -> Validator:
+    """Compile a JSON Schema subset into a function that validates a value.
+
+    The returned function raises SchemaError on invalid input and returns the
+    value with object defaults filled in. Unsupported keywords are rejected
+    here rather than silently ignored at call time.
+    """
+    unknown = set(schema) - SUPPORTED_KEYWORDS
+    if unknown:
+        raise ValueError(f"Unsupported schema keywords at '{path or '/'}': {sorted(unknown)}")
+
+    checks: List[Callable[[Any], Any]] = []
+    where = f" at '{path}'" if path else ""
+
+    if "type" in schema:
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        type_checks = [_TYPE_CHECKS[t] for t in types]
+        expected = types[0] if len(types) == 1 else types
+        # 5.0 is a valid integer; handlers get it as 5 unless floats are allowed too
+        to_int = "integer" in types and "number" not in types
+
+        def check_type(value):
+            if not any(check(value) for check in type_checks):
+                raise SchemaError(f"{_describe(value)} is not of type {_describe(expected)}{where}")
+            if to_int and isinstance(value, float):
+                return int(value)
+            return value
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value):
+            if value not in allowed:
+                raise SchemaError(f"{_describe(value)} is not one of {allowed}{where}")
+            return value
+        checks.append(check_enum)
+
+    for keyword, bad in (("minimum", lambda v, n: v < n), ("maximum", lambda v, n: v > n)):
+        if keyword in schema:
+            bound = schema[keyword]
+
+            def check_bound(value, keyword=keyword, bad=bad, bound=bound):
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and bad(value, bound):
+                    raise SchemaError(f"{value} violates {keyword} {bound}{where}")
+                return value
+            checks.append(check_bound)
+
+    for keyword, kind, bad in (
+        ("minLength", str, lambda v, n: len(v) < n), ("maxLength", str, lambda v, n: len(v) > n),
+        ("minItems", list, lambda v, n: len(v) < n), ("maxItems", list, lambda v, n: len(v) > n),
+    ):
+        if keyword in schema:
+            bound = schema[keyword]
+
+            def check_size(value, keyword=keyword, kind=kind, bad=bad, bound=bound):
+                if isinstance(value, kind) and bad(value, bound):
+                    raise SchemaError(f"{_describe(value)} violates {keyword} {bound}{where}")
+                return value
+            checks.append(check_size)
+
+    if "items" in schema:
+        item_validator = compile_schema(schema["items"], f"{path}[]")
+
+        def check_items(value):
+            if isinstance(value, list):
+                return [item_validator(item) for item in value]
+            return value
+        checks.append(check_items)
+
+    if "properties" in schema or "required" in schema or "additionalProperties" in schema:
+        properties = {
+            name: compile_schema(sub, f"{path}/{name}")
+            for name, sub in schema.get("properties", {}).items()
+        }
+        defaults = {
+            name: sub["default"]
+            for name, sub in schema.get("properties", {}).items()
+            if "default" in sub
+        }
+        required = tuple(schema.get("required", ()))
+        additional = schema.get("additionalProperties", True)
+        extra_validator = compile_schema(additional, f"{path}/*") if isinstance(additional, dict) else None
+
+        def check_object(value):
+            if not isinstance(value, dict):
+                return value
+            for name in required:
+                if name not in value:
+                    raise SchemaError(f"'{name}' is a required property{where}")
+            result = dict(defaults)
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    result[name] = validator(item)
+                elif extra_validator is not None:
+                    result[name] = extra_validator(item)
+                elif additional is False:
+                    raise SchemaError(f"Additional property '{name}' is not allowed{where}")
+                else:
+                    result[name] = item
+            return result
+        checks.append(check_object)
+
+    def validate(value):
+        for check in checks:
+            value = check(value)
+        return value
+    return validate
+
+
+class ToolExecutor:
+    """Runs tool handlers inline, in a thread pool or in a process pool"""
+
+    def __init__(self, thread_workers: int = THREAD_WORKERS, process_workers: int = PROCESS_WORKERS,
+                 queue_depth: int = POOL_QUEUE_DEPTH, process_initializer: Optional[Callable[[], Any]] = None):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.process_initializer = process_initializer
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_slots = process_workers + queue_depth
+        self._slots = {
+            "thread": asyncio.Semaphore(thread_workers + queue_depth),
+            "process": asyncio.Semaphore(self._process_slots),
+        }
+        # One cancellation flag per admitted process call, shared with the workers
+        self._flags = None
+        self._free_flags: List[int] = []
+
+    def _pool(self, policy: str):
+        if policy == "thread":
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(self.thread_workers, thread_name_prefix="tool")
+            return self._thread_pool
+        if self._process_pool is None:
+            # spawn, not fork: the server process has an event loop and helper threads
+            context = multiprocessing.get_context("spawn")
+            self._flags = context.RawArray("b", self._process_slots)
+            self._free_flags = list(range(self._process_slots))
+            self._process_pool = ProcessPoolExecutor(
+                self.process_workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(self._flags, self.process_initializer),
+            )
+        return self._process_pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken process pool so the next call starts a fresh one.
+
+        Only the current pool is dropped: a late failure from an older pool
+        must not discard the replacement (and the flags of its calls).
+        """
+        if self._process_pool is pool:
+            self._process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> None:
+        """Start the process pool workers ahead of the first heavy call"""
+        pool = self._pool("process")
+        for _ in range(self.process_workers):
+            pool.submit(os.getpid)
+
+    def _release(self, policy: str, token: CancelToken) -> None:
+        if isinstance(token, SlotToken) and token._flags is self._flags:
+            self._free_flags.append(token.slot)
+        self._slots[policy].release()
+
+    async def run(self, policy: str, handler: Handler, arguments: Dict[str, Any],
+                  deadline: Optional[float] = None) -> Any:
+        if policy == "inline":
+            return await handler(arguments)
+
+        await self._slots[policy].acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            pool = self._pool(policy)
+            if policy == "process":
+                token = SlotToken(self._flags, self._free_flags.pop(), deadline)
+            else:
+                token = CancelToken(deadline)
+            future = pool.submit(run_with_token, handler, token, arguments)
+        except BrokenProcessPool:
+            self._release(policy, token)
+            self._discard(pool)
+            raise RuntimeError("Tool worker process crashed; please retry") from None
+        except BaseException:
+            self._slots[policy].release()
+            raise
+
+        # The slot (and its cancellation flag) stays taken until the worker is
+        # really done, even if the caller gives up earlier
+        def finished(_):
+            try:
+                loop.call_soon_threadsafe(self._release, policy, token)
+            except RuntimeError:  # event loop already closed
+                pass
+        future.add_done_callback(finished)
+
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); replace the pool for later calls
+            self._discard(pool)
+            raise RuntimeError("Tool worker process crashed; please retry") from None
+
+    def shutdown(self) -> None:
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = None
+        self._process_pool = None
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    description: str
+    input_schema: Dict[str, Any]
+    handler: Handler
+    execution: str = "inline"
+    concurrency: Optional[int] = None
+    max_queue: int = DEFAULT_MAX_QUEUE
+    priority: str = "interactive"
+    validator: Validator = field(init=False, repr=False)
+    limiter: Optional[ToolLimiter] = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        if self.execution not in EXECUTION_POLICIES:
+            raise ValueError(f"Unknown execution policy for {self.name}: {self.execution}")
+        priority_rank(self.priority)
+        self.validator = compile_schema(self.input_schema)
+        if self.concurrency:
+            self.limiter = ToolLimiter(self.name, self.concurrency, self.max_queue)
+
+    def to_tool(self) -> Tool:
+        return Tool(name=self.name, description=self.description, inputSchema=self.input_schema)
+
+
+class ToolRegistry:
+    def __init__(self, executor: Optional[ToolExecutor] = None, limits: Optional[str] = None):
+        self._specs: Dict[str, ToolSpec] = {}
+        self._tools: Optional[List[Tool]] = None
+        self.executor = executor or ToolExecutor()
+        self._limits = parse_limits(os.environ.get("MCP_TOOL_LIMITS", "") if limits is None else limits)
+
+    def tool(self, name: str, description: str, input_schema: Dict[str, Any], execution: str = "inline",
+             concurrency: Optional[int] = None, max_queue: int = DEFAULT_MAX_QUEUE, priority: str = "interactive"):
+        """Decorator registering handler(arguments) as a tool.
+
+        Inline handlers are async; thread and process handlers are plain functions.
+        """
+        def decorator(handler: Handler) -> Handler:
+            self.register(ToolSpec(name, description, input_schema, handler, execution,
+                                   concurrency, max_queue, priority))
+            return handler
+        return decorator
+
+    def register(self, spec: ToolSpec) -> None:
+        if spec.name in self._specs:
+            raise ValueError(f"Tool already registered: {spec.name}")
+        if spec.name in self._limits:
+            concurrency, max_queue = self._limits[spec.name]
+            spec.limiter = ToolLimiter(spec.name, concurrency, spec.max_queue if max_queue is None else max_queue)
+        self._specs[spec.name] = spec
+        self._tools = None
+
+    def get(self, name: str) -> ToolSpec:
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown tool: {name}")
+        return spec
+
+    def list_tools(self) -> List[Tool]:
+        """The tools/list payload, built once and reused"""
+        if self._tools is None:
+            self._tools = [spec.to_tool() for spec in self._specs.values()]
+        return self._tools
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Admission counters for every limited tool"""
+        return {name: spec.limiter.stats() for name, spec in self._specs.items() if spec.limiter}
+
+    async def call(self, name: str, arguments: Optional[Dict[str, Any]],
+                   priority: Union[str, int, None] = None, deadline: Optional[float] = None) -> List[TextContent]:
+        """Validate arguments, wait for admission and run the tool's handler.
+
+        priority ("interactive", "batch" or an integer rank) defaults to the
+        tool's own priority. deadline is an absolute time.time() after which
+        the call is abandoned with DeadlineExceeded, whether it is still
+        queued or already running. Raises admission.Overloaded when the
+        tool's queue is full.
+        """
+        spec = self.get(name)
+        try:
+            arguments = spec.validator(arguments or {})
+        except SchemaError as e:
+            raise SchemaError(f"Input validation error: {e}") from None
+        rank = priority_rank(priority, spec.priority)
+        if deadline is None:
+            return await self._run(spec, arguments, rank, None)
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline for {name} passed before the call started")
+        try:
+            return await asyncio.wait_for(self._run(spec, arguments, rank, deadline), remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{name} did not finish before its deadline") from None
+
+    async def _run(self, spec: ToolSpec, arguments: Dict[str, Any], rank: int,
+                   deadline: Optional[float]) -> List[TextContent]:
+        async with Admission(spec.limiter, rank):
+            return await self.executor.run(spec.execution, spec.handler, arguments, deadline)
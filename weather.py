@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Weather lookups for the get_weather and get_weather_batch tools.
+
+fetch_weather queries the upstream provider: an HTTP service at
+WEATHER_API_URL when set, otherwise a built-in stub. HTTP requests share one
+keep-alive connection pool.
+
+get_weather resolves locations to canonical places with the gazetteer and
+fronts the upstream with a TTL/LRU cache keyed by place, so repeated,
+concurrent and differently spelled lookups for the same city cost a single
+upstream call. get_weather_batch fans a list of locations out over the pool
+with bounded concurrency.
+
+Environment:
+  WEATHER_API_URL          - upstream endpoint, called as GET <url>?location=<name>
+  WEATHER_UPSTREAM_DELAY   - simulated latency of the built-in stub in seconds (default 0)
+  WEATHER_CACHE_TTL        - seconds a cached report stays fresh (default 300)
+  WEATHER_CACHE_SIZE       - maximum cached locations (default 1024)
+  WEATHER_MAX_CONNECTIONS  - HTTP connection pool size (default 20)
+  WEATHER_BATCH_CONCURRENCY - concurrent upstream calls per batch (default 10)
+
+Run a local stand-in for the upstream service with:
+  python weather.py serve --port 8081
+  export WEATHER_API_URL=http://127.0.0.1:8081/weather
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import gazetteer
+from cache import TTLCache
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+API_URL = os.environ.get("WEATHER_API_URL")
+UPSTREAM_DELAY = float(os.environ.get("WEATHER_UPSTREAM_DELAY", "0"))
+CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", "300"))
+CACHE_SIZE = int(os.environ.get("WEATHER_CACHE_SIZE", "1024"))
+MAX_CONNECTIONS = int(os.environ.get("WEATHER_MAX_CONNECTIONS", "20"))
+BATCH_CONCURRENCY = int(os.environ.get("WEATHER_BATCH_CONCURRENCY", "10"))
+REQUEST_TIMEOUT = 10.0
+
+weather_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+upstream_calls = 0
+_http_client: Optional["httpx.AsyncClient"] = None
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Return the shared keep-alive HTTP client for the upstream provider"""
+    global _http_client
+    if httpx is None:
+        raise RuntimeError("WEATHER_API_URL requires httpx. Install with: pip install httpx")
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the pooled upstream connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    return f"Weather in {report['location']}: {report['temperature_f']}°F, {report['conditions']}"
+
+
+async def fetch_weather(location: str) -> str:
+    """Query the upstream weather provider"""
+    global upstream_calls
+    upstream_calls += 1
+    if API_URL:
+        response = await get_http_client().get(API_URL, params={"location": location})
+        response.raise_for_status()
+        return format_report(response.json())
+    if UPSTREAM_DELAY:
+        await asyncio.sleep(UPSTREAM_DELAY)
+    return format_report({"location": location, "temperature_f": 72, "conditions": "sunny"})
+
+
+def canonicalize(location: str) -> Tuple[str, str]:
+    """Return (cache key, upstream name) for a free-text location.
+
+    Known places share the gazetteer ID as their key, so spelling variants
+    hit the same cache entry; unknown names fall back to normalized text.
+    """
+    place = gazetteer.resolve(location)
+    if place is not None:
+        return place.id, place.name
+    return gazetteer.normalize(location) or location, location.strip()
+
+
+async def get_weather(location: str) -> str:
+    """Return the weather for a location, served from cache when fresh"""
+    key, name = canonicalize(location)
+    return await weather_cache.get_or_load(key, lambda: fetch_weather(name))
+
+
+async def get_weather_batch(locations: List[str], concurrency: int = BATCH_CONCURRENCY) -> List[str]:
+    """Look up many locations concurrently; results keep the input order.
+
+    A failed lookup is reported in its own line instead of failing the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(location: str) -> str:
+        async with semaphore:
+            try:
+                return await get_weather(location)
+            except Exception as e:
+                return f"Weather in {location}: unavailable ({e})"
+
+    return list(await asyncio.gather(*(lookup(location) for location in locations)))
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Cache counters plus the number of upstream calls made"""
+    return {**weather_cache.stats(), "upstream_calls": upstream_calls}
+
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    """Stand-in upstream: GET /weather?location=<name> returns a JSON report"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        location = parse_qs(url.query).get("location", [""])[0]
+        if url.path != "/weather" or not location:
+            self.send_error(404 if url.path != "/weather" else 400)
+            return
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({"location": location, "temperature_f": 72, "conditions": "sunny"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub(host: str = "127.0.0.1", port: int = 8081, delay: float = 0.0) -> None:
+    """Run the stand-in upstream weather service until interrupted"""
+    handler = type("DelayedStubWeatherHandler", (StubWeatherHandler,), {"delay": delay})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Stub weather service on http://{host}:{port}/weather")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weather tool helpers")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the stand-in upstream weather service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8081)
+    serve.add_argument("--delay", type=float, default=0.0, help="Seconds of latency per request")
+    args = parser.parse_args()
+    serve_stub(args.host, args.port, args.delay)
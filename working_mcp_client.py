@@ -15,6 +15,9 @@ except ImportError:
     print("MCP not installed. Install with: pip install mcp")
     exit(1)
 
+from mcp_session_pool import result_text
+from tool_catalog import CatalogTracker, ToolCatalog, server_identity
+
 class WorkingMCPClient:
     def __init__(self):
         self.session = None
@@ -27,15 +30,19 @@ class WorkingMCPClient:
             args=["mcp_server.py"]
         )
         
+        # Tool schemas come from the on-disk catalog when the server version
+        # matches, and are refreshed in the background or on tools/list_changed
+        tracker = CatalogTracker(server_identity(server_params), ToolCatalog())
+        
         # Use proper async context manager
         async with stdio_client(server_params) as (read_stream, write_stream):
-            async with ClientSession(read_stream, write_stream) as session:
+            async with ClientSession(read_stream, write_stream, message_handler=tracker.message_handler) as session, tracker:
                 # Initialize the session
-                await session.initialize()
+                init = await session.initialize()
                 
                 # Get available tools
-                tools_response = await session.list_tools()
-                self.available_tools = [tool.name for tool in tools_response.tools]
+                await tracker.attach(session, init)
+                self.available_tools = tracker.tool_names
                 print(f"Connected! Available tools: {self.available_tools}")
                 
                 # Test search_documents
@@ -44,14 +51,14 @@ class WorkingMCPClient:
                     "query": "machine learning",
                     "limit": 5
                 })
-                print(f"Search result: {search_result.content[0].text}")
+                print(f"Search result: {result_text(search_result)}")
                 
                 # Test get_weather
                 print("\n2. Testing weather lookup...")
                 weather_result = await session.call_tool("get_weather", {
                     "location": "San Francisco"
                 })
-                print(f"Weather result: {weather_result.content[0].text}")
+                print(f"Weather result: {result_text(weather_result)}")
                 
                 # Test with different parameters
                 print("\n3. Testing different parameters...")
@@ -59,12 +66,12 @@ class WorkingMCPClient:
                     "query": "artificial intelligence",
                     "limit": 3
                 })
-                print(f"AI search: {ai_search.content[0].text}")
+                print(f"AI search: {result_text(ai_search)}")
                 
                 tokyo_weather = await session.call_tool("get_weather", {
                     "location": "Tokyo"
                 })
-                print(f"Tokyo weather: {tokyo_weather.content[0].text}")
+                print(f"Tokyo weather: {result_text(tokyo_weather)}")
                 
                 print("\n✓ All MCP tool calls completed successfully!")
 